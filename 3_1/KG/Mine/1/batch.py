@@ -0,0 +1,165 @@
+import ctypes
+
+import OpenGL.GL as gl
+import numpy as np
+
+# x, y, z, r, g, b
+VERTEX_SIZE = 6
+FLOAT_SIZE = 4
+
+
+class BatchRenderer:
+    """ Draws many coloured primitives with one program, one interleaved
+        vertex buffer and a single glMultiDrawArrays call.
+
+        The program needs the position at attribute location 0 and the
+        colour at location 1, e.g. the COLOR_VERTEX variant of
+        UBER_VERTEX_SHADER. Primitives can be added and removed at any time,
+        only the changed part of the buffer is uploaded. The buffer grows on
+        the GPU when it is full, freed ranges are reused by later primitives.
+
+        With a GLState (see ../2/gl_state.py) the program and the vertex
+        array are only bound if something else was bound in between.
+    """
+
+    def __init__(self, program, mode=gl.GL_TRIANGLES, capacity=1024,
+                 state=None):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.program = program
+        self.state = state
+        self.mode = mode
+        self.capacity = capacity
+        # handle -> (first vertex, vertex count)
+        self.primitives = dict()
+        # unused (first vertex, vertex count) ranges below self.end
+        self.free = []
+        self.end = 0
+        self.next_handle = 0
+        self.draw_lists = None
+
+        self.vao = gl.glGenVertexArrays(1)
+        self.vbo = self._create_buffer(capacity)
+
+    def _create_buffer(self, capacity):
+        vbo = gl.glGenBuffers(1)
+        self._bind_vertex_array(self.vao)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, vbo)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER,
+                        capacity * VERTEX_SIZE * FLOAT_SIZE, None,
+                        gl.GL_DYNAMIC_DRAW)
+        stride = VERTEX_SIZE * FLOAT_SIZE
+        gl.glVertexAttribPointer(0, 3, gl.GL_FLOAT, gl.GL_FALSE, stride,
+                                 ctypes.c_void_p(0))
+        gl.glEnableVertexAttribArray(0)
+        gl.glVertexAttribPointer(1, 3, gl.GL_FLOAT, gl.GL_FALSE, stride,
+                                 ctypes.c_void_p(3 * FLOAT_SIZE))
+        gl.glEnableVertexAttribArray(1)
+        self._bind_vertex_array(0)
+        return vbo
+
+    def _bind_vertex_array(self, vao):
+        if self.state is None:
+            gl.glBindVertexArray(vao)
+        else:
+            self.state.bind_vertex_array(vao)
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        old_vbo = self.vbo
+        self.vbo = self._create_buffer(capacity)
+
+        # copy the existing vertices on the GPU
+        gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, old_vbo)
+        gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, self.vbo)
+        gl.glCopyBufferSubData(gl.GL_COPY_READ_BUFFER, gl.GL_COPY_WRITE_BUFFER,
+                               0, 0, self.end * VERTEX_SIZE * FLOAT_SIZE)
+        gl.glDeleteBuffers(1, np.array([old_vbo], dtype=np.uint32))
+        self.capacity = capacity
+
+    def _allocate(self, count):
+        # first fit in the freed ranges, otherwise append at the end
+        for k, (first, size) in enumerate(self.free):
+            if size >= count:
+                if size == count:
+                    del self.free[k]
+                else:
+                    self.free[k] = (first + count, size - count)
+                return first
+        if self.end + count > self.capacity:
+            self._grow(self.end + count)
+        first = self.end
+        self.end += count
+        return first
+
+    def add(self, vertices, color):
+        """ Adds a primitive and returns its handle.
+
+        Args:
+            vertices (array like): The (x, y, z) positions of its vertices.
+            color (array like): One (r, g, b) colour or one per vertex.
+        """
+        vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        data = np.empty((len(vertices), VERTEX_SIZE), dtype=np.float32)
+        data[:, :3] = vertices
+        data[:, 3:] = color
+
+        first = self._allocate(len(data))
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        gl.glBufferSubData(gl.GL_ARRAY_BUFFER,
+                           first * VERTEX_SIZE * FLOAT_SIZE, data.nbytes, data)
+
+        handle = self.next_handle
+        self.next_handle += 1
+        self.primitives[handle] = (first, len(data))
+        self.draw_lists = None
+        return handle
+
+    def remove(self, handle):
+        """ Removes a primitive, its vertices stay in the buffer until the
+            range is reused.
+        """
+        first, count = self.primitives.pop(handle)
+        self.draw_lists = None
+        if first + count == self.end:
+            self.end = first
+        else:
+            self.free.append((first, count))
+        self.free.sort()
+
+        # merge neighbouring free ranges and give a free range at the end
+        # back to the unused part of the buffer
+        merged = []
+        for first, count in self.free:
+            if len(merged) > 0 and merged[-1][0] + merged[-1][1] == first:
+                merged[-1] = (merged[-1][0], merged[-1][1] + count)
+            else:
+                merged.append((first, count))
+        if len(merged) > 0 and merged[-1][0] + merged[-1][1] == self.end:
+            self.end = merged.pop()[0]
+        self.free = merged
+
+    def __len__(self):
+        return len(self.primitives)
+
+    def draw(self):
+        if len(self.primitives) == 0:
+            return
+        if self.draw_lists is None:
+            ranges = sorted(self.primitives.values())
+            self.draw_lists = (np.array([r[0] for r in ranges], np.int32),
+                               np.array([r[1] for r in ranges], np.int32))
+        firsts, counts = self.draw_lists
+
+        if self.state is None:
+            gl.glUseProgram(self.program)
+        else:
+            self.state.use_program(self.program)
+        self._bind_vertex_array(self.vao)
+        gl.glMultiDrawArrays(self.mode, firsts, counts, len(firsts))
+
+    def delete(self):
+        gl.glDeleteVertexArrays(1, np.array([self.vao], dtype=np.uint32))
+        gl.glDeleteBuffers(1, np.array([self.vbo], dtype=np.uint32))
@@ -0,0 +1,179 @@
+import ctypes
+import time
+
+import glfw
+import OpenGL.GL as gl
+import numpy as np
+
+FLOAT_SIZE = 4
+
+# per instance attributes: (location, component count, offset in floats)
+INSTANCE_ATTRIBUTES = [
+    (1, 2, 0),  # offset
+    (2, 1, 2),  # scale
+    (3, 1, 3),  # rotation
+    (4, 3, 4),  # color
+]
+INSTANCE_SIZE = 7
+
+
+class InstancedRenderer:
+    """ Draws one shape many times with a single instanced draw call.
+
+        The program needs the position at attribute location 0 and the
+        instance attributes at the locations 1 to 4, see the COLOR_INSTANCE
+        variant of UBER_VERTEX_SHADER. The instance data is uploaded once by
+        set_instances and stays on the GPU until it is set again.
+
+    Args:
+        program: The shader program.
+        vertices (array like): The (x, y, z) positions of the shape.
+        indices (array like): Optional indices of the shape, then the shape
+            is drawn with glDrawElementsInstanced.
+        mode: The primitive type of the shape.
+    """
+
+    def __init__(self, program, vertices, indices=None,
+                 mode=gl.GL_TRIANGLES):
+        self.program = program
+        self.mode = mode
+        self.instance_count = 0
+
+        vertices = np.ascontiguousarray(vertices, dtype=np.float32)
+        vertices = vertices.reshape(-1, 3)
+        self.vertex_count = len(vertices)
+
+        self.vao = gl.glGenVertexArrays(1)
+        gl.glBindVertexArray(self.vao)
+
+        self.vbo = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, vertices.nbytes, vertices,
+                        gl.GL_STATIC_DRAW)
+        gl.glVertexAttribPointer(0, 3, gl.GL_FLOAT, gl.GL_FALSE, 0, None)
+        gl.glEnableVertexAttribArray(0)
+
+        self.ebo = None
+        if indices is not None:
+            indices = np.ascontiguousarray(indices, dtype=np.uint32).ravel()
+            self.index_count = len(indices)
+            self.ebo = gl.glGenBuffers(1)
+            gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+            gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, indices.nbytes,
+                            indices, gl.GL_STATIC_DRAW)
+
+        # the instance attributes advance once per instance
+        self.instance_vbo = gl.glGenBuffers(1)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.instance_vbo)
+        stride = INSTANCE_SIZE * FLOAT_SIZE
+        for location, size, offset in INSTANCE_ATTRIBUTES:
+            gl.glVertexAttribPointer(location, size, gl.GL_FLOAT, gl.GL_FALSE,
+                                     stride, ctypes.c_void_p(offset * FLOAT_SIZE))
+            gl.glEnableVertexAttribArray(location)
+            gl.glVertexAttribDivisor(location, 1)
+
+        gl.glBindVertexArray(0)
+
+    def set_instances(self, offsets, scales=1.0, rotations=0.0,
+                      colors=(1.0, 1.0, 1.0)):
+        """ Uploads the instances.
+
+        Args:
+            offsets (array like): The (n, 2) translations of the instances.
+            scales (array like): One scale or n scales.
+            rotations (array like): One rotation or n rotations in radians.
+            colors (array like): One (r, g, b) colour or n colours.
+        """
+        offsets = np.asarray(offsets, dtype=np.float32).reshape(-1, 2)
+        data = np.empty((len(offsets), INSTANCE_SIZE), dtype=np.float32)
+        data[:, 0:2] = offsets
+        data[:, 2] = scales
+        data[:, 3] = rotations
+        data[:, 4:7] = colors
+
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.instance_vbo)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, data.nbytes, data,
+                        gl.GL_STATIC_DRAW)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+        self.instance_count = len(data)
+
+    def draw(self):
+        if self.instance_count == 0:
+            return
+        gl.glUseProgram(self.program)
+        gl.glBindVertexArray(self.vao)
+        if self.ebo is None:
+            gl.glDrawArraysInstanced(self.mode, 0, self.vertex_count,
+                                     self.instance_count)
+        else:
+            gl.glDrawElementsInstanced(self.mode, self.index_count,
+                                       gl.GL_UNSIGNED_INT, None,
+                                       self.instance_count)
+
+    def delete(self):
+        gl.glDeleteVertexArrays(1, np.array([self.vao], dtype=np.uint32))
+        buffers = [self.vbo, self.instance_vbo]
+        if self.ebo is not None:
+            buffers.append(self.ebo)
+        gl.glDeleteBuffers(len(buffers), np.array(buffers, dtype=np.uint32))
+
+
+def random_instances(count, seed=0):
+    """ Returns random offsets, scales, rotations and colours for count
+        instances.
+    """
+    rng = np.random.default_rng(seed)
+    offsets = rng.uniform(-1.0, 1.0, (count, 2))
+    scales = rng.uniform(0.01, 0.05, count)
+    rotations = rng.uniform(0.0, 2 * np.pi, count)
+    colors = rng.random((count, 3))
+    return offsets, scales, rotations, colors
+
+
+def main(count=100000):
+    from shader_cache import ShaderCache
+    from uber_shader import UberShader
+
+    if not glfw.init():
+        return
+
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+
+    window = glfw.create_window(800, 600, "Instanced Triangles", None, None)
+    if not window:
+        glfw.terminate()
+        return
+    glfw.make_context_current(window)
+
+    shaders = ShaderCache()
+    program = UberShader(shaders, "instance").program
+    triangle = [-0.5, -0.5, 0.0,
+                0.5, -0.5, 0.0,
+                0.0, 0.5, 0.0]
+    renderer = InstancedRenderer(program, triangle)
+    renderer.set_instances(*random_instances(count))
+
+    frames = 0
+    start = time.perf_counter()
+    while not glfw.window_should_close(window):
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+        renderer.draw()
+        glfw.swap_buffers(window)
+        glfw.poll_events()
+
+        frames += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= 1.0:
+            print(f"{count} instances: {frames / elapsed:.1f} FPS")
+            frames = 0
+            start = time.perf_counter()
+
+    renderer.delete()
+    shaders.delete()
+    glfw.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,35 @@
+import os
+import sys
+
 import glfw
+
+# the modules shared with the shapes (gl_state, gl_config, offscreen)
+SHARED_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "2")
+
+if __name__ == "__main__":
+    # the PyOpenGL flags of GL_MODE have to be set before OpenGL.GL is
+    # imported, only when this is the program
+    sys.path.append(SHARED_DIRECTORY)
+    import gl_config
+    gl_config.configure()
+
 import OpenGL.GL as gl
 import numpy as np
-from shaders import VERTEX_SHADER, RED_FRAGMENT_SHADER, GREEN_FRAGMENT_SHADER, BLUE_FRAGMENT_SHADER
 
-def compile_shader(shader_type, source):
-    shader = gl.glCreateShader(shader_type)
-    gl.glShaderSource(shader, source)
-    gl.glCompileShader(shader)
-    if not gl.glGetShaderiv(shader, gl.GL_COMPILE_STATUS):
-        raise RuntimeError(gl.glGetShaderInfoLog(shader))
-    return shader
+from batch import BatchRenderer
+from shader_cache import ShaderCache
+from uber_shader import UberShader
 
-def create_shader_program(vertex_shader_source, fragment_shader_source):
-    vertex_shader = compile_shader(gl.GL_VERTEX_SHADER, vertex_shader_source)
-    fragment_shader = compile_shader(gl.GL_FRAGMENT_SHADER, fragment_shader_source)
-    
-    program = gl.glCreateProgram()
-    gl.glAttachShader(program, vertex_shader)
-    gl.glAttachShader(program, fragment_shader)
-    gl.glLinkProgram(program)
-    
-    if not gl.glGetProgramiv(program, gl.GL_LINK_STATUS):
-        raise RuntimeError(gl.glGetProgramInfoLog(program))
-    
-    gl.glDeleteShader(vertex_shader)
-    gl.glDeleteShader(fragment_shader)
-    
-    return program
-
-def main():
-    # Initialize GLFW
+def add_shared_directory():
+    # puts the shared modules on the path of the code which needs them
+    if SHARED_DIRECTORY not in sys.path:
+        sys.path.append(SHARED_DIRECTORY)
 
-    
-    if not glfw.init():
-        return
-    
-    # Configure GLFW
-    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
-    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
-    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
-    
-    # Create window
-    window = glfw.create_window(800, 600, "Three Triangles", None, None)
-    if not window:
-        glfw.terminate()
-        return
-    
-    glfw.make_context_current(window)
-    init_opengl()
-    
-    # Create shader programs
-    shader_programs = [
-        create_shader_program(VERTEX_SHADER, RED_FRAGMENT_SHADER),
-        create_shader_program(VERTEX_SHADER, GREEN_FRAGMENT_SHADER),
-        create_shader_program(VERTEX_SHADER, BLUE_FRAGMENT_SHADER)
-    ]
+def create_scene(shaders, state=None):
+    # Create one shader program for all colours, a stored binary of it is
+    # loaded instead of compiling it again
+    program = UberShader(shaders, "vertex").program
     
     # Triangle vertices
     triangles = [
@@ -78,42 +53,91 @@ def main():
         ], dtype=np.float32)
     ]
     
-    # Create VAOs and VBOs
-    vaos = gl.glGenVertexArrays(3)
-    vbos = gl.glGenBuffers(3)
+    # Put all triangles into one batch
+    colors = [
+        (1.0, 0.0, 0.0),  # Red
+        (0.0, 1.0, 0.0),  # Green
+        (0.0, 0.0, 1.0)   # Blue
+    ]
+    batch = BatchRenderer(program, state=state)
+    for triangle, color in zip(triangles, colors):
+        batch.add(triangle, color)
+    
+    return batch
+
+def main():
+    add_shared_directory()
+    import gl_config
+    from gl_state import GLState
+
+    # Initialize GLFW
+    if not glfw.init():
+        return
+    
+    # Configure GLFW
+    glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+    glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+    glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+    if gl_config.mode == 'debug':
+        glfw.window_hint(glfw.OPENGL_DEBUG_CONTEXT, glfw.TRUE)
+    
+    # Create window
+    window = glfw.create_window(800, 600, "Three Triangles", None, None)
+    if not window:
+        glfw.terminate()
+        return
+    
+    glfw.make_context_current(window)
+    gl_config.context_ready()
+    init_opengl()
     
-    for i in range(3):
-        gl.glBindVertexArray(vaos[i])
-        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, vbos[i])
-        gl.glBufferData(gl.GL_ARRAY_BUFFER, triangles[i].nbytes, triangles[i], gl.GL_STATIC_DRAW)
-        gl.glVertexAttribPointer(0, 3, gl.GL_FLOAT, gl.GL_FALSE, 0, None)
-        gl.glEnableVertexAttribArray(0)
+    shaders = ShaderCache()
+    # the program and the vertex array are only bound in the first frame
+    state = GLState()
+    batch = create_scene(shaders, state)
     
     # Main loop
     while not glfw.window_should_close(window):
         # Clear the screen
         gl.glClear(gl.GL_COLOR_BUFFER_BIT)
         
-        # Draw each triangle with its respective shader
-        for i in range(3):
-            gl.glUseProgram(shader_programs[i])
-            gl.glBindVertexArray(vaos[i])
-            gl.glDrawArrays(gl.GL_TRIANGLES, 0, 3)
+        # Draw all triangles with a single draw call
+        batch.draw()
         
         # Swap buffers and poll events
         glfw.swap_buffers(window)
         glfw.poll_events()
     
+    counters = state.counters()
+    print(f"GL state calls: {counters['issued']} issued, "
+          f"{counters['suppressed']} suppressed")
+    
     # Cleanup
-    for vao in vaos:
-        gl.glDeleteVertexArrays(1, [vao])
-    for vbo in vbos:
-        gl.glDeleteBuffers(1, [vbo])
-    for program in shader_programs:
-        gl.glDeleteProgram(program)
+    batch.delete()
+    shaders.delete()
     
     glfw.terminate()
 
+def render_offscreen(frames=1, width=800, height=600):
+    # Renders the scene without a window and returns the frames as a
+    # (frames, height, width, 4) uint8 array. Without a display PyOpenGL has
+    # to use EGL, run with PYOPENGL_PLATFORM=egl.
+    add_shared_directory()
+    from offscreen import OffscreenContext
+    
+    with OffscreenContext(width, height, core=True) as context:
+        shaders = ShaderCache()
+        batch = create_scene(shaders)
+        
+        def draw():
+            gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+            batch.draw()
+        
+        pixels = context.render(draw, frames)
+        batch.delete()
+        shaders.delete()
+    return pixels
+
 def init_opengl():
     # Get OpenGL version info
     version = gl.glGetString(gl.GL_VERSION)
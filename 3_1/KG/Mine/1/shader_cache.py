@@ -0,0 +1,199 @@
+""" Cache of compiled shaders and linked shader programs.
+
+    Shader stages are compiled once per source text and shared between the
+    programs using them, a program is linked once per (vertex, fragment)
+    pair. Linked programs are stored on disk with glGetProgramBinary and
+    loaded with glProgramBinary on the next start, so a warm start does not
+    compile anything. A binary the driver rejects (e.g. after a driver
+    update) is deleted and the program is built from source again.
+"""
+
+import ctypes
+import hashlib
+import os
+import struct
+import tempfile
+
+import OpenGL.GL as gl
+from OpenGL.error import GLError
+
+DEFAULT_DIRECTORY = os.path.join(
+    os.path.expanduser("~"), ".cache", "shader_programs")
+
+# file header: magic, binary format
+HEADER = struct.Struct("<4sI")
+MAGIC = b"GLPB"
+
+
+def source_hash(*sources):
+    digest = hashlib.sha256()
+    for source in sources:
+        digest.update(source.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ShaderCache:
+    """ Compiles, links and stores shader programs.
+
+        The programs belong to the cache, they are deleted by delete()
+        instead of glDeleteProgram.
+
+    Args:
+        directory (str): Where program binaries are stored, None disables
+            the binaries.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+        # (shader type, source hash) -> shader
+        self.stages = dict()
+        # program hash -> program
+        self.programs = dict()
+        self.compiled = 0
+        self.linked = 0
+        self.loaded = 0
+
+        # binaries only fit the driver that created them
+        self.driver = "{}:{}".format(
+            gl.glGetString(gl.GL_RENDERER).decode(),
+            gl.glGetString(gl.GL_VERSION).decode())
+        if directory is not None and \
+                gl.glGetIntegerv(gl.GL_NUM_PROGRAM_BINARY_FORMATS) == 0:
+            self.directory = None
+
+    def compile(self, shader_type, source):
+        """ Returns the compiled shader of the source, compiling it only on
+            the first request.
+        """
+        key = (shader_type, source_hash(source))
+        shader = self.stages.get(key)
+        if shader is None:
+            shader = gl.glCreateShader(shader_type)
+            gl.glShaderSource(shader, source)
+            gl.glCompileShader(shader)
+            if not gl.glGetShaderiv(shader, gl.GL_COMPILE_STATUS):
+                log = gl.glGetShaderInfoLog(shader)
+                gl.glDeleteShader(shader)
+                raise RuntimeError(log)
+            self.stages[key] = shader
+            self.compiled += 1
+        return shader
+
+    def program(self, vertex_shader_source, fragment_shader_source):
+        """ Returns the program of the two shaders, from memory, from a
+            stored binary or built from the sources.
+        """
+        key = source_hash(self.driver, vertex_shader_source,
+                          fragment_shader_source)
+        program = self.programs.get(key)
+        if program is None:
+            program = self._load(key)
+        if program is None:
+            program = self._link(vertex_shader_source, fragment_shader_source)
+            self._store(key, program)
+        self.programs[key] = program
+        return program
+
+    def _link(self, vertex_shader_source, fragment_shader_source):
+        vertex_shader = self.compile(gl.GL_VERTEX_SHADER,
+                                     vertex_shader_source)
+        fragment_shader = self.compile(gl.GL_FRAGMENT_SHADER,
+                                       fragment_shader_source)
+
+        program = gl.glCreateProgram()
+        if self.directory is not None:
+            gl.glProgramParameteri(program,
+                                   gl.GL_PROGRAM_BINARY_RETRIEVABLE_HINT,
+                                   gl.GL_TRUE)
+        gl.glAttachShader(program, vertex_shader)
+        gl.glAttachShader(program, fragment_shader)
+        gl.glLinkProgram(program)
+
+        if not gl.glGetProgramiv(program, gl.GL_LINK_STATUS):
+            log = gl.glGetProgramInfoLog(program)
+            gl.glDeleteProgram(program)
+            raise RuntimeError(log)
+
+        # the stages stay in the cache for other programs
+        gl.glDetachShader(program, vertex_shader)
+        gl.glDetachShader(program, fragment_shader)
+        self.linked += 1
+        return program
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".bin")
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+
+        program = None
+        if len(data) > HEADER.size:
+            magic, binary_format = HEADER.unpack_from(data)
+            if magic == MAGIC:
+                binary = data[HEADER.size:]
+                program = gl.glCreateProgram()
+                try:
+                    gl.glProgramBinary(program, binary_format, binary,
+                                       len(binary))
+                    linked = gl.glGetProgramiv(program, gl.GL_LINK_STATUS)
+                except GLError:
+                    # an unknown binary format is an invalid enum
+                    linked = False
+                if not linked:
+                    gl.glDeleteProgram(program)
+                    program = None
+        if program is None:
+            # rejected by the driver or broken, it is replaced
+            try:
+                os.remove(path)
+            except OSError:
+                # e.g. already removed by another process
+                pass
+            return None
+        self.loaded += 1
+        return program
+
+    def _store(self, key, program):
+        if self.directory is None:
+            return
+        length = gl.glGetProgramiv(program, gl.GL_PROGRAM_BINARY_LENGTH)
+        if length == 0:
+            return
+        binary = ctypes.create_string_buffer(int(length))
+        written = gl.GLsizei()
+        binary_format = gl.GLenum()
+        gl.glGetProgramBinary(program, length, written, binary_format, binary)
+
+        # write to a temporary file first, so a crash or a concurrent
+        # process never leaves a partial binary behind
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            handle, temporary = tempfile.mkstemp(dir=self.directory,
+                                                 suffix=".tmp")
+        except OSError:
+            # a read only cache still works, just without binaries
+            return
+        try:
+            with os.fdopen(handle, "wb") as file:
+                file.write(HEADER.pack(MAGIC, binary_format.value))
+                file.write(binary.raw[:written.value])
+            os.replace(temporary, self.path(key))
+        except OSError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def delete(self):
+        for program in self.programs.values():
+            gl.glDeleteProgram(program)
+        for shader in self.stages.values():
+            gl.glDeleteShader(shader)
+        self.programs.clear()
+        self.stages.clear()
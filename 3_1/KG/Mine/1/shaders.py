@@ -1,33 +1,49 @@
-# Vertex shader - position only
-VERTEX_SHADER = """
+# Uber shader - one source for every colour source, a variant is chosen by
+# defining COLOR_UNIFORM, COLOR_VERTEX or COLOR_INSTANCE after #version
+# (see uber_shader.py)
+UBER_VERTEX_SHADER = """
 #version 330 core
 layout (location = 0) in vec3 position;
+#if defined(COLOR_VERTEX)
+layout (location = 1) in vec3 color;
+#elif defined(COLOR_INSTANCE)
+layout (location = 1) in vec2 offset;
+layout (location = 2) in float scale;
+layout (location = 3) in float rotation;
+layout (location = 4) in vec3 color;
+#endif
+#if !defined(COLOR_UNIFORM)
+out vec3 vertexColor;
+#endif
 void main() {
+#if defined(COLOR_INSTANCE)
+    float c = cos(rotation);
+    float s = sin(rotation);
+    vec2 rotated = vec2(c * position.x - s * position.y,
+                        s * position.x + c * position.y);
+    gl_Position = vec4(scale * rotated + offset, position.z, 1.0);
+#else
     gl_Position = vec4(position, 1.0);
+#endif
+#if !defined(COLOR_UNIFORM)
+    vertexColor = color;
+#endif
 }
 """
 
-# Fragment shaders - one for each color
-RED_FRAGMENT_SHADER = """
+UBER_FRAGMENT_SHADER = """
 #version 330 core
+#if defined(COLOR_UNIFORM)
+uniform vec3 color;
+#else
+in vec3 vertexColor;
+#endif
 out vec4 FragColor;
 void main() {
-    FragColor = vec4(1.0, 0.0, 0.0, 1.0);  // Red
+#if defined(COLOR_UNIFORM)
+    FragColor = vec4(color, 1.0);
+#else
+    FragColor = vec4(vertexColor, 1.0);
+#endif
 }
 """
-
-GREEN_FRAGMENT_SHADER = """
-#version 330 core
-out vec4 FragColor;
-void main() {
-    FragColor = vec4(0.0, 1.0, 0.0, 1.0);  // Green
-}
-"""
-
-BLUE_FRAGMENT_SHADER = """
-#version 330 core
-out vec4 FragColor;
-void main() {
-    FragColor = vec4(0.0, 0.0, 1.0, 1.0);  // Blue
-}
-"""
\ No newline at end of file
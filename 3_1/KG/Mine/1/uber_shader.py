@@ -0,0 +1,75 @@
+""" Variants of the uber shader in shaders.py.
+
+    The colour of a primitive comes from a uniform, from a vertex attribute
+    or from an instance attribute. The variant is selected by a #define
+    inserted into the shader sources when the program is built, so any
+    amount of colours is drawn with one program. The uniform locations are
+    looked up once after linking and never in the frame loop.
+"""
+
+import OpenGL.GL as gl
+
+from shaders import UBER_VERTEX_SHADER, UBER_FRAGMENT_SHADER
+
+# colour source -> preprocessor define
+COLOR_SOURCES = {
+    "uniform": "COLOR_UNIFORM",
+    "vertex": "COLOR_VERTEX",
+    "instance": "COLOR_INSTANCE",
+}
+
+
+def variant_source(source, defines):
+    """ Returns the source with a #define line for every define, placed
+        right after the #version line which has to stay the first line.
+    """
+    lines = source.lstrip().split("\n")
+    if not lines[0].startswith("#version"):
+        raise ValueError("The shader source has to start with #version")
+    return "\n".join(lines[:1] + [f"#define {define}" for define in defines]
+                     + lines[1:])
+
+
+def uniform_locations(program):
+    """ Returns the locations of all active uniforms of a program by name. """
+    locations = dict()
+    count = gl.glGetProgramiv(program, gl.GL_ACTIVE_UNIFORMS)
+    for index in range(count):
+        name, size, uniform_type = gl.glGetActiveUniform(program, index)
+        name = name.decode() if isinstance(name, bytes) else name
+        # arrays are reported as name[0]
+        name = name.split("[")[0]
+        locations[name] = gl.glGetUniformLocation(program, name)
+    return locations
+
+
+class UberShader:
+    """ A variant of the uber shader.
+
+        The attribute locations match the renderers: position at 0, the
+        vertex colour at 1 like BatchRenderer, the instance attributes at 1
+        to 4 like InstancedRenderer.
+
+    Args:
+        shaders (ShaderCache): Builds and stores the program.
+        color_source (str): 'uniform', 'vertex' or 'instance'.
+    """
+
+    def __init__(self, shaders, color_source="vertex"):
+        if color_source not in COLOR_SOURCES:
+            raise ValueError(f"Unknown colour source: {color_source}")
+        self.color_source = color_source
+        defines = [COLOR_SOURCES[color_source]]
+        self.program = shaders.program(
+            variant_source(UBER_VERTEX_SHADER, defines),
+            variant_source(UBER_FRAGMENT_SHADER, defines))
+        self.locations = uniform_locations(self.program)
+
+    def use(self):
+        gl.glUseProgram(self.program)
+
+    def set_color(self, color):
+        """ Sets the colour of the 'uniform' variant, the program has to be
+            in use.
+        """
+        gl.glUniform3f(self.locations["color"], *color)
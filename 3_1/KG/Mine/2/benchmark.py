@@ -0,0 +1,363 @@
+""" Benchmarks of the OpenGLShapes tasks and the stripifiers.
+
+    Every task is rendered offscreen with every combination of its modes, in
+    immediate (glBegin/glEnd) and retained (vertex buffer) mode, in streamed
+    (ring buffer) mode for the n-gon fan, and for several n. For each case the CPU time and the wall time of a frame, the
+    frames per second and the GL calls per frame are measured. The
+    stripifiers are timed on grid meshes of growing size.
+
+    The results are written as JSON and/or CSV. Given the JSON of an
+    earlier run, the cases that got slower than the tolerance are reported
+    and the exit status is 1:
+
+        python benchmark.py --output baseline.json
+        python benchmark.py --baseline baseline.json --csv results.csv
+"""
+
+import argparse
+import contextlib
+import csv
+import functools
+import io
+import json
+import sys
+import time
+
+# offscreen has to choose the PyOpenGL platform before main imports OpenGL
+import offscreen
+import numpy as np
+from OpenGL.GL import *
+
+import geometry_cache
+import gl_state
+import main
+import render_queue
+import ring_buffer
+from geometry import grid_triangles
+from main import OpenGLShapes
+from triangle_strip import stripify
+
+MODES = ['immediate', 'retained', 'streamed']
+TASKS = list(range(1, 9))
+# the tasks that draw a regular n-gon
+N_TASKS = {1, 2, 6}
+TRIANGLE_MODES = ['triangles', 'triangle_strip', 'triangle_fan']
+SHADING_MODES = ['flat', 'smooth']
+FACE_MODES = ['normal', 'vertices_front', 'filled_front_wire_back',
+              'wireframe']
+# the strip methods with a bounded run time, "exact" and "parallel" have no
+# search budget and can run for hours on the benchmark meshes
+STRIP_METHODS = ['greedy', 'iterative', 'fans']
+# the default time limit of the iterative search in seconds
+STRIP_TIME_LIMIT = 10.0
+# the tasks drawing the n-gon fan, the only figure with a streamed mode
+STREAMED_TASKS = [6]
+# the metric compared against the baseline for every kind of result
+METRICS = {'frame': 'frame_ms', 'strip': 'seconds'}
+
+
+def task_cases(tasks=TASKS, n_values=(8,)):
+    """ Returns the settings of every task and mode combination.
+
+        Every task is measured with both shading modes, the tasks which
+        use n, the triangle mode or the face mode with each of their values.
+
+    Returns:
+        list of dict: OpenGLShapes attributes, always with current_task and
+        shading_mode.
+    """
+    cases = []
+    for task in tasks:
+        if task in N_TASKS:
+            variants = [{'n': n} for n in n_values]
+        elif task == 5:
+            variants = [{'triangle_mode': triangle}
+                        for triangle in TRIANGLE_MODES]
+        elif task == 8:
+            variants = [{'face_mode': face} for face in FACE_MODES]
+        else:
+            variants = [{}]
+        cases.extend({'current_task': task, 'shading_mode': shading,
+                      **variant}
+                     for variant in variants for shading in SHADING_MODES)
+    return cases
+
+
+class GLCallCounter:
+    """ Counts the GL calls made by the given modules.
+
+        The gl* functions the modules imported with 'from OpenGL.GL import *'
+        are replaced by counting wrappers while the counter is active. The
+        wrappers slow the calls down, so frames are timed without them.
+    """
+
+    def __init__(self, modules=(main, geometry_cache, gl_state, render_queue,
+                                ring_buffer)):
+        self.modules = modules
+        self.calls = 0
+        self.originals = []
+
+    def _wrap(self, function):
+        @functools.wraps(function)
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return function(*args, **kwargs)
+        return counted
+
+    def __enter__(self):
+        self.calls = 0
+        for module in self.modules:
+            for name, value in list(vars(module).items()):
+                if name.startswith('gl') and callable(value):
+                    self.originals.append((module, name, value))
+                    setattr(module, name, self._wrap(value))
+        return self
+
+    def __exit__(self, *exc_info):
+        for module, name, value in self.originals:
+            setattr(module, name, value)
+        self.originals.clear()
+
+
+def reset_state(shapes, width, height):
+    # task 8 leaves culling and polygon modes behind
+    glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
+    glDisable(GL_CULL_FACE)
+    shapes.init_gl(width, height)
+
+
+def measure_frames(shapes, frames, warmup=5):
+    """ Draws frames and measures every one of them.
+
+    Returns:
+        dict: The mean CPU time, the mean, median and 95th percentile wall
+            time of a frame in ms, the frames per second and the GL calls
+            of one frame.
+    """
+    for _ in range(warmup):
+        shapes.display()
+    glFinish()
+
+    cpu = np.empty(frames)
+    wall = np.empty(frames)
+    for frame in range(frames):
+        start_cpu = time.process_time_ns()
+        start = time.perf_counter_ns()
+        shapes.display()
+        # wait for the driver, otherwise the work is counted in a later frame
+        glFinish()
+        wall[frame] = time.perf_counter_ns() - start
+        cpu[frame] = time.process_time_ns() - start_cpu
+    cpu /= 1e6
+    wall /= 1e6
+
+    shapes.gl_state.reset_counters()
+    with GLCallCounter() as counter:
+        shapes.display()
+    glFinish()
+
+    return {
+        'frames': frames,
+        'cpu_ms': float(cpu.mean()),
+        'frame_ms': float(wall.mean()),
+        'median_ms': float(np.median(wall)),
+        'p95_ms': float(np.percentile(wall, 95)),
+        'fps': float(1000.0 / wall.mean()),
+        'gl_calls': counter.calls,
+        'state_calls_suppressed': shapes.gl_state.suppressed,
+    }
+
+
+def benchmark_tasks(cases, modes=MODES, frames=100, warmup=5, width=800,
+                    height=600):
+    """ Measures every case in every mode in one offscreen context.
+
+    Returns:
+        list of dict: One result per case and mode.
+    """
+    results = []
+    with offscreen.OffscreenContext(width, height) as context:
+        for settings in cases:
+            for mode in modes:
+                if (mode == 'streamed'
+                        and settings['current_task'] not in STREAMED_TASKS):
+                    continue
+                shapes = OpenGLShapes(retained=mode == 'retained',
+                                      streamed=mode == 'streamed')
+                for name, value in settings.items():
+                    setattr(shapes, name, value)
+                reset_state(shapes, width, height)
+                context.bind()
+                # task 5 prints a line every frame
+                with contextlib.redirect_stdout(io.StringIO()):
+                    measured = measure_frames(shapes, frames, warmup)
+                shapes.geometry.clear()
+                shapes.delete_dynamic_fan()
+                results.append({'kind': 'frame', 'mode': mode, **settings,
+                                **measured})
+    return results
+
+
+def benchmark_strips(sizes, methods=('greedy',), repeat=3, options=None):
+    """ Times the stripifiers on square grid meshes.
+
+    Args:
+        sizes (list of int): The approximate triangle counts.
+        methods (list of str): Keys of triangle_strip.STRIP_METHODS.
+        repeat (int): The best of this many runs is reported.
+        options (dict): Keyword arguments of the methods by name, e.g.
+            {'iterative': {'time_limit': 1.0}}.
+
+    Returns:
+        list of dict: One result per size and method.
+    """
+    options = options or dict()
+    results = []
+    for size in sizes:
+        side = max(1, int(round((size / 2) ** 0.5)))
+        triangles = grid_triangles(side, side)
+        for method in methods:
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                strip = stripify(triangles, method,
+                                 **options.get(method, dict()))
+                times.append(time.perf_counter() - start)
+            results.append({'kind': 'strip', 'method': method,
+                            'triangles': len(triangles),
+                            'seconds': min(times),
+                            'strip_length': len(strip)})
+    return results
+
+
+def result_key(result):
+    """ Returns the name of the measured case, without the measurements. """
+    metric_names = {'frames', 'cpu_ms', 'frame_ms', 'median_ms', 'p95_ms',
+                    'fps', 'gl_calls', 'state_calls_suppressed', 'seconds',
+                    'strip_length'}
+    return ' '.join(f'{name}={value}' for name, value in sorted(result.items())
+                    if name not in metric_names)
+
+
+def compare(results, baseline, tolerance=0.1):
+    """ Compares the results with the results of an earlier run.
+
+    Returns:
+        list of tuple: (key, baseline value, value, ratio) of every case
+            that is more than tolerance slower than in the baseline.
+    """
+    previous = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        metric = METRICS[result['kind']]
+        ratio = result[metric] / old[metric] if old[metric] else float('inf')
+        if ratio > 1.0 + tolerance:
+            regressions.append((result_key(result), old[metric],
+                                result[metric], ratio))
+    return regressions
+
+
+def compare_modes(results):
+    """ Returns (key, immediate ms, retained ms, speedup) of every case that
+        was measured in both modes.
+    """
+    frames = dict()
+    for result in results:
+        if result['kind'] == 'frame':
+            case = {k: v for k, v in result.items() if k != 'mode'}
+            frames.setdefault(result_key(case), dict())[result['mode']] = \
+                result['frame_ms']
+    return [(key, times['immediate'], times['retained'],
+             times['immediate'] / times['retained'])
+            for key, times in frames.items()
+            if 'immediate' in times and 'retained' in times]
+
+
+def write_json(results, path):
+    with open(path, 'w') as file:
+        json.dump({'results': results}, file, indent=2)
+
+
+def read_json(path):
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def write_csv(results, path):
+    columns = []
+    for result in results:
+        columns.extend(name for name in result if name not in columns)
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, columns)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the OpenGLShapes tasks and the stripifiers.")
+    parser.add_argument('--tasks', type=int, nargs='*', default=TASKS)
+    parser.add_argument('--modes', nargs='*', choices=MODES, default=MODES)
+    parser.add_argument('--n', type=int, nargs='*', default=[8, 64, 1024],
+                        help="n of the n-gon tasks")
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--size', type=int, nargs=2, default=(800, 600),
+                        metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--strip-sizes', type=int, nargs='*',
+                        default=[200, 2000, 20000],
+                        help="triangle counts of the stripifier meshes")
+    parser.add_argument('--strip-methods', nargs='*', choices=STRIP_METHODS,
+                        default=['greedy'])
+    parser.add_argument('--strip-time-limit', type=float,
+                        default=STRIP_TIME_LIMIT,
+                        help="time limit of the iterative search")
+    parser.add_argument('--output', help="write the results as JSON")
+    parser.add_argument('--csv', help="write the results as CSV")
+    parser.add_argument('--baseline', help="JSON results to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="allowed slowdown against the baseline")
+    args = parser.parse_args(argv)
+
+    results = benchmark_tasks(task_cases(args.tasks, args.n), args.modes,
+                              args.frames, args.warmup, *args.size)
+    strip_options = {'iterative': {'time_limit': args.strip_time_limit}}
+    results += benchmark_strips(args.strip_sizes, args.strip_methods,
+                                options=strip_options)
+
+    for result in results:
+        if result['kind'] == 'frame':
+            print(f"{result_key(result)}: {result['frame_ms']:.3f} ms "
+                  f"(cpu {result['cpu_ms']:.3f} ms, {result['fps']:.0f} FPS, "
+                  f"{result['gl_calls']} GL calls)")
+        else:
+            print(f"{result_key(result)}: {result['seconds']:.4f} s, "
+                  f"{result['strip_length']} strip vertices")
+
+    comparison = compare_modes(results)
+    if comparison:
+        print("\nimmediate vs retained:")
+        for key, immediate, retained, speedup in comparison:
+            print(f"{key}: {immediate:.3f} ms -> {retained:.3f} ms "
+                  f"({speedup:.2f}x)")
+
+    if args.output:
+        write_json(results, args.output)
+    if args.csv:
+        write_csv(results, args.csv)
+
+    if args.baseline:
+        regressions = compare(results, read_json(args.baseline),
+                              args.tolerance)
+        for key, old, new, ratio in regressions:
+            print(f"REGRESSION {key}: {old:.4f} -> {new:.4f} ({ratio:.2f}x)")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,102 @@
+""" Vertex data of the figures drawn by OpenGLShapes. """
+
+FIGURE1_VERTICES = [
+    (-1.8, -0.5), (-1.2, 1), (-0.9, -1.8),
+    (-0.9, 0.4), (0, 0.4), (0, 1), (2, -1)
+]
+
+FIGURE2_VERTICES = [
+    (-2, -1), (-1.2, 1.5), (1, 2), (0.5, 1), (2, 1.3), (2, 0.3), (0.5, 0.3), (0.5, -1.4), (-0.7, 0.3)
+]
+
+# figure 2 split into individual triangles
+FIGURE2_TRIANGLES = [
+    (-2, -1), (-1.2, 1.5), (1, 2),
+    (0.16, 1.16), (-0.7, 0.3), (2, 0.3),
+    (0.5, 1), (2, 1.3), (2, 0.3),
+    (0.16, 1.16), (1, 2), (0.5, 1),
+    (0.5, 0.3), (0.5, -1.4), (-0.7, 0.3)
+]
+
+# figure 2 split into triangle strips
+FIGURE2_STRIPS = [
+    [
+        (-2, -1),
+        (-1.2, 1.5),
+        (-0.7, 0.3),
+        (1, 2),
+        (-1, 0.6),
+        (0.5, 1),
+    ],
+    [
+        (2, 1.3),
+        (2, 0.3),
+        (-0.5, 0.8),
+        (-1, 0.3),
+    ],
+    [
+        (-0.7, 0.3),
+        (0.5, -1.4),
+        (0.5, 0.3),
+    ],
+]
+
+# figure 2 split into triangle fans
+FIGURE2_FANS = [
+    {
+        'center': (-0.7, 0.3),
+        'vertices': [
+            (-2, -1),
+            (-1.2, 1.5)
+        ]
+    },
+    {
+        'center': (-1.2, 1.5),
+        'vertices': [
+            (-0.7, 0.3),
+            (1, 2)
+        ]
+    },
+    {   # Fan 3 (Triangle C)
+        'center': (-0.7, 0.3),
+        'vertices': [
+            (1, 2),
+            (-1, 0.6)
+        ]
+    },
+    {
+        'center': (-1, 0.6),
+        'vertices': [
+            (1, 2),
+            (0.5, 1)
+        ]
+    },
+    {
+        'center': (-0.5, 0.8),
+        'vertices': [
+            (2, 1.3),
+            (2, 0.3),
+            (-1, 0.3)
+        ]
+    },
+    {
+        'center': (-0.7, 0.3),
+        'vertices': [
+            (0.5, -1.4),
+            (0.5, 0.3)
+        ]
+    }
+]
+
+FIGURE3_TRIANGLES = [
+    [(-1.5, -1.5), (-1.0, -0.5), (-0.5, -1.6)],
+    [(-0.71, -1.15), (-0.5, -1.6), (0.5, -1.7)],
+    [(0.5, -1.7), (-0.71, -1.15), (0.7, -1.15)],
+    [(0.0, -1.15), (0.25, 0.52), (0.7, -1.15)],
+    [(0.7, -1.15), (0.25, 0.52), (1.2, 0.42)],
+    [(0.0, -1.15), (0.25, 0.52), (-0.5, 0.6)],
+    [(-1.5, -0.5), (-0.5, 0.6), (-0.5, -0.5)],
+    [(-1.5, -0.5), (-1.5, 0.7), (-0.5, 0.6)],
+    [(-1.5, 0.7), (1.2, 0.42), (-1.5, 0.9)],
+    [(-1.5, 0.9), (1.2, 0.42), (1.25, 0.6)]
+]
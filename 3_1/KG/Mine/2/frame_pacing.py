@@ -0,0 +1,111 @@
+""" Frame pacing of the GLFW render loop.
+
+    A FrameScheduler decides when the next frame is drawn:
+
+    'uncapped'   draws as fast as possible, e.g. for benchmarks.
+    'vsync'      lets glfw.swap_buffers wait for the vertical retrace.
+    'target'     draws at a fixed rate. The deadlines are multiples of the
+                 frame period since the start, so a late or early frame is
+                 corrected by the next wait instead of drifting.
+    'on_demand'  only draws after request_redraw() and blocks in
+                 glfw.wait_events in between, an unchanged scene costs no
+                 CPU time.
+
+    Usage:
+
+        scheduler = FrameScheduler('target', fps=30)
+        scheduler.start()
+        while not glfw.window_should_close(window):
+            if scheduler.begin_frame():
+                draw()
+                glfw.swap_buffers(window)
+            scheduler.end_frame()
+"""
+
+import time
+
+import glfw
+
+PACING_MODES = ('uncapped', 'vsync', 'target', 'on_demand')
+# time.sleep may wake up late, the last part of a wait is spent spinning
+SPIN_NS = 1_000_000
+
+
+class FrameScheduler:
+    """ Paces the frames of a render loop.
+
+    Args:
+        mode (str): One of PACING_MODES.
+        fps (float): The frame rate of the 'target' mode.
+    """
+
+    def __init__(self, mode='target', fps=30.0):
+        if mode not in PACING_MODES:
+            raise ValueError(f"Unknown pacing mode: {mode}")
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self.mode = mode
+        self.period_ns = int(round(1e9 / fps))
+        self.deadline = None
+        self.redraw = True
+        self.frames = 0
+        self.last_frame = None
+        # duration between the last two frames
+        self.frame_time_ns = 0
+
+    def start(self):
+        """ Sets the swap interval, needs a current GLFW context. """
+        glfw.swap_interval(1 if self.mode == 'vsync' else 0)
+        self.deadline = time.perf_counter_ns() + self.period_ns
+        self.redraw = True
+
+    def request_redraw(self):
+        """ Marks that the scene changed and has to be drawn again. """
+        self.redraw = True
+
+    def begin_frame(self):
+        """ Returns True if a frame should be drawn now. """
+        if self.mode == 'on_demand' and not self.redraw:
+            return False
+        self.redraw = False
+
+        now = time.perf_counter_ns()
+        if self.last_frame is not None:
+            self.frame_time_ns = now - self.last_frame
+        self.last_frame = now
+        self.frames += 1
+        return True
+
+    def end_frame(self):
+        """ Processes the window events and waits until the next frame. """
+        if self.mode == 'on_demand':
+            # the key callbacks run in here and may request a redraw
+            if not self.redraw:
+                glfw.wait_events()
+            else:
+                glfw.poll_events()
+            return
+
+        glfw.poll_events()
+        if self.mode == 'target':
+            self._wait_for_deadline()
+
+    def _wait_for_deadline(self):
+        now = time.perf_counter_ns()
+        if now - self.deadline > self.period_ns:
+            # more than a frame behind (e.g. the window was dragged), start
+            # over instead of drawing the missed frames in a burst
+            self.deadline = now
+        remaining = self.deadline - now
+        if remaining > SPIN_NS:
+            time.sleep((remaining - SPIN_NS) / 1e9)
+        while time.perf_counter_ns() < self.deadline:
+            pass
+        self.deadline += self.period_ns
+
+    @property
+    def fps(self):
+        """ The frame rate measured between the last two frames. """
+        if self.frame_time_ns == 0:
+            return 0.0
+        return 1e9 / self.frame_time_ns
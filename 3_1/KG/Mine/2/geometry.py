@@ -0,0 +1,219 @@
+""" Vectorized generators of regular polygons, fans, line loops and strips.
+
+    Every function returns float32 (positions, colours) or unsigned
+    (indices) arrays that can be passed to glBufferData as they are. An
+    optional out array of the right shape and type is filled instead of
+    allocating a new one, so geometry regenerated every time n changes can
+    reuse its memory.
+"""
+
+import zlib
+
+import numpy as np
+
+
+def _output(out, shape, dtype=np.float32):
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != shape or out.dtype != dtype:
+        raise ValueError(
+            f"out must have the shape {shape} and the type "
+            f"{np.dtype(dtype).name}, got {out.shape} {out.dtype.name}")
+    return out
+
+
+def _corners(result, first, n, radius, center):
+    # writes the n corners (plus the repeated first corner if the result has
+    # space for it) of a regular polygon into result[first:]
+    count = len(result) - first
+    angles = np.arange(count) * (2 * np.pi / n)
+    np.cos(angles, out=result[first:, 0])
+    np.sin(angles, out=result[first:, 1])
+    result[first:, :2] *= radius
+    result[first:, 0] += center[0]
+    result[first:, 1] += center[1]
+    if result.shape[1] > 2:
+        result[first:, 2:] = 0.0
+    return result
+
+
+def regular_polygon(n, radius=1.0, center=(0.0, 0.0), dimension=2,
+                    closed=False, out=None):
+    """ Returns the corners of a regular n-gon, the first corner at angle 0.
+        These can be drawn as GL_POINTS, GL_LINE_LOOP or GL_POLYGON.
+
+    Args:
+        n (int): The amount of corners.
+        radius (float): The distance of the corners to the center.
+        center (tuple): The x and y coordinate of the center.
+        dimension (int): 2 for (x, y), 3 for (x, y, 0) positions.
+        closed (bool): If True, the first corner is repeated at the end, e.g.
+            to draw the outline as GL_LINE_STRIP.
+        out (numpy.ndarray): Optional float32 array to write into.
+
+    Returns:
+        numpy.ndarray: An (n, dimension) or (n + 1, dimension) array.
+    """
+    count = n + 1 if closed else n
+    result = _output(out, (count, dimension))
+    return _corners(result, 0, n, radius, center)
+
+
+def polygon_fan(n, radius=1.0, center=(0.0, 0.0), dimension=2, out=None):
+    """ Returns the vertices of a regular n-gon as GL_TRIANGLE_FAN: the
+        center, the n corners and the first corner again.
+
+    Returns:
+        numpy.ndarray: An (n + 2, dimension) array.
+    """
+    result = _output(out, (n + 2, dimension))
+    result[0, :2] = center
+    result[0, 2:] = 0.0
+    return _corners(result, 1, n, radius, center)
+
+
+def fan_indices(n, closed=True, out=None):
+    """ Returns the GL_TRIANGLES indices of a fan around vertex 0 with the
+        vertices 1 to n on the rim (like regular_polygon(n) preceded by the
+        center).
+
+    Args:
+        n (int): The amount of rim vertices.
+        closed (bool): If True, the last triangle connects vertex n with
+            vertex 1, otherwise there are n - 1 triangles.
+        out (numpy.ndarray): Optional uint32 array to write into.
+
+    Returns:
+        numpy.ndarray: An (n, 3) or (n - 1, 3) uint32 array.
+    """
+    count = n if closed else n - 1
+    result = _output(out, (count, 3), np.uint32)
+    result[:, 0] = 0
+    result[:, 1] = np.arange(1, count + 1)
+    result[:, 2] = result[:, 1] + 1
+    if closed:
+        result[-1, 2] = 1
+    return result
+
+
+def line_loop_indices(n, out=None):
+    """ Returns the GL_LINES indices of a closed loop through the vertices 0
+        to n - 1.
+
+    Returns:
+        numpy.ndarray: An (n, 2) uint32 array.
+    """
+    result = _output(out, (n, 2), np.uint32)
+    result[:, 0] = np.arange(n)
+    result[:, 1] = result[:, 0] + 1
+    result[-1, 1] = 0
+    return result
+
+
+def ring_strip(n, inner_radius, outer_radius, center=(0.0, 0.0),
+               dimension=2, out=None):
+    """ Returns a closed ring between two regular n-gons as GL_TRIANGLE_STRIP,
+        alternating between the outer and the inner corners.
+
+    Returns:
+        numpy.ndarray: An (2 * n + 2, dimension) array.
+    """
+    result = _output(out, (2 * n + 2, dimension))
+    _corners(result[0::2], 0, n, outer_radius, center)
+    _corners(result[1::2], 0, n, inner_radius, center)
+    return result
+
+
+def random_colors(count, rng=None, out=None):
+    """ Returns count random RGB colours.
+
+    Args:
+        count (int): The amount of colours.
+        rng (numpy.random.Generator): The random generator to use.
+        out (numpy.ndarray): Optional float32 array to write into.
+
+    Returns:
+        numpy.ndarray: A (count, 3) float32 array.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    result = _output(out, (count, 3))
+    rng.random((count, 3), dtype=np.float32, out=result)
+    return result
+
+
+def interleave(positions, colors, out=None):
+    """ Interleaves positions and colours into one vertex array, e.g.
+        x, y, r, g, b for every vertex.
+
+    Returns:
+        numpy.ndarray: A (count, d + 3) float32 array.
+    """
+    result = _output(out, (len(positions),
+                           positions.shape[1] + colors.shape[1]))
+    result[:, :positions.shape[1]] = positions
+    result[:, positions.shape[1]:] = colors
+    return result
+
+
+def grid_triangles(rows, columns, out=None):
+    """ Returns the GL_TRIANGLES indices of a grid of rows x columns quads,
+        two triangles per quad, over (rows + 1) * (columns + 1) vertices in
+        row major order. Useful as a test mesh of a given size.
+
+    Returns:
+        numpy.ndarray: A (2 * rows * columns, 3) uint32 array.
+    """
+    result = _output(out, (2 * rows * columns, 3), np.uint32)
+    corner = (np.arange(rows)[:, None] * (columns + 1) +
+              np.arange(columns)[None, :]).ravel()
+    # lower left, lower right, upper left and upper right corner of a quad
+    result[0::2, 0] = corner
+    result[0::2, 1] = corner + 1
+    result[0::2, 2] = corner + columns + 1
+    result[1::2, 0] = corner + 1
+    result[1::2, 1] = corner + columns + 2
+    result[1::2, 2] = corner + columns + 1
+    return result
+
+
+class Palette:
+    """ Random colours that stay the same until the palette is reset.
+
+        The figures take their colours in drawing order with next or take,
+        and rewind the palette before every frame, so a figure is drawn
+        with the same colours until the state it is drawn in changes.
+
+    Args:
+        size (int): The amount of colours, they repeat after that.
+        seed (int): The seed of the colours.
+    """
+
+    def __init__(self, size=256, seed=0):
+        self.size = size
+        self.seed = seed
+        self.index = 0
+        self.colors = None
+        self.reset()
+
+    def reset(self, *state):
+        """ Generates new colours, the same state gives the same colours. """
+        key = zlib.crc32(repr(state).encode())
+        self.colors = random_colors(self.size,
+                                    np.random.default_rng([self.seed, key]))
+        self.index = 0
+
+    def rewind(self):
+        self.index = 0
+
+    def next(self):
+        """ Returns the next colour as an (r, g, b) array. """
+        color = self.colors[self.index % self.size]
+        self.index += 1
+        return color
+
+    def take(self, count):
+        """ Returns the next count colours as a (count, 3) array. """
+        indices = np.arange(self.index, self.index + count) % self.size
+        self.index += count
+        return self.colors[indices]
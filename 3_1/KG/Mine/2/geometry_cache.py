@@ -0,0 +1,292 @@
+""" Retained mode geometry of the OpenGLShapes figures.
+
+    The positions and colours of a figure are built once with numpy,
+    uploaded into a vertex buffer and drawn with a single draw call. Figures
+    made of triangles are stripified into one indexed triangle strip (see
+    strip_mesh.py). The buffers are only rebuilt when a setting that changes
+    the figures (the task, n or one of the modes) changes.
+"""
+
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+from figures import (FIGURE1_VERTICES, FIGURE2_VERTICES, FIGURE2_TRIANGLES,
+                     FIGURE2_STRIPS, FIGURE2_FANS, FIGURE3_TRIANGLES)
+from geometry import interleave, polygon_fan, regular_polygon
+from render_queue import DrawRange
+from strip_mesh import StripMesh
+
+FLOAT_SIZE = 4
+
+
+class FigureGeometry:
+    """ Vertex buffer of a figure.
+
+    Args:
+        mode: The primitive type, e.g. GL_TRIANGLES.
+        positions (array like): An (n, 2) array of vertex positions.
+        colors (array like): An (n, 3) array of vertex colours or None to
+            draw with the current colour.
+        firsts (list): The first vertex of every primitive batch, a figure
+            made of several strips or fans is drawn with glMultiDrawArrays.
+        counts (list): The vertex count of every primitive batch.
+        indices (array like): Optional uint16 or uint32 indices, then the
+            figure is drawn with glDrawElements from an element buffer.
+        restart_index (int): The primitive restart index of the indices or
+            None.
+        flat (bool): If True, the figure is drawn with flat shading, e.g.
+            because its vertices hold the colours of whole triangles.
+    """
+
+    def __init__(self, mode, positions, colors=None, firsts=None,
+                 counts=None, indices=None, restart_index=None, flat=False):
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 2)
+        self.mode = mode
+        self.vertex_count = len(positions)
+        self.has_colors = colors is not None
+        if firsts is None:
+            firsts, counts = [0], [self.vertex_count]
+        self.firsts = np.asarray(firsts, dtype=np.int32)
+        self.counts = np.asarray(counts, dtype=np.int32)
+
+        # interleave the positions and the colours: x, y, r, g, b
+        if self.has_colors:
+            colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+            data = interleave(positions, colors)
+        else:
+            data = np.ascontiguousarray(positions)
+        self.stride = data.shape[1] * FLOAT_SIZE
+
+        self.vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+
+        self.ebo = None
+        self.restart_index = restart_index
+        self.flat = flat
+        if indices is not None:
+            indices = np.ascontiguousarray(indices)
+            self.index_count = len(indices)
+            self.index_type = (GL_UNSIGNED_SHORT if indices.dtype == np.uint16
+                               else GL_UNSIGNED_INT)
+            self.ebo = glGenBuffers(1)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices,
+                         GL_STATIC_DRAW)
+
+        # the array setup is recorded in a vertex array object if the
+        # context supports it, otherwise it is repeated for every draw
+        self.vao = None
+        if bool(glGenVertexArrays):
+            self.vao = glGenVertexArrays(1)
+            glBindVertexArray(self.vao)
+            self._enable_arrays()
+            glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def _enable_arrays(self):
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        if self.ebo is not None:
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(2, GL_FLOAT, self.stride, ctypes.c_void_p(0))
+        if self.has_colors:
+            glEnableClientState(GL_COLOR_ARRAY)
+            glColorPointer(3, GL_FLOAT, self.stride,
+                           ctypes.c_void_p(2 * FLOAT_SIZE))
+
+    def _disable_arrays(self):
+        glDisableClientState(GL_VERTEX_ARRAY)
+        if self.has_colors:
+            glDisableClientState(GL_COLOR_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def draw(self):
+        if self.vao is not None:
+            glBindVertexArray(self.vao)
+        else:
+            self._enable_arrays()
+
+        if self.flat:
+            glPushAttrib(GL_LIGHTING_BIT)
+            glShadeModel(GL_FLAT)
+        if self.restart_index is not None:
+            glEnable(GL_PRIMITIVE_RESTART)
+            glPrimitiveRestartIndex(self.restart_index)
+
+        if self.ebo is not None:
+            glDrawElements(self.mode, self.index_count, self.index_type, None)
+        elif len(self.firsts) == 1:
+            glDrawArrays(self.mode, int(self.firsts[0]), int(self.counts[0]))
+        else:
+            glMultiDrawArrays(self.mode, self.firsts, self.counts,
+                              len(self.firsts))
+
+        if self.restart_index is not None:
+            glDisable(GL_PRIMITIVE_RESTART)
+        if self.flat:
+            glPopAttrib()
+
+        if self.vao is not None:
+            glBindVertexArray(0)
+        else:
+            self._disable_arrays()
+
+    def draw_range(self):
+        """ Returns the figure as a render_queue.DrawRange, the figure needs
+            a vertex array object and a single primitive batch.
+        """
+        if self.vao is None or (self.ebo is None and len(self.firsts) > 1):
+            raise ValueError("The figure can not be drawn as a single range")
+        if self.ebo is not None:
+            return DrawRange(self.vao, self.mode, 0, self.index_count,
+                             self.index_type, self.restart_index, self.flat)
+        return DrawRange(self.vao, self.mode, int(self.firsts[0]),
+                         int(self.counts[0]), flat=self.flat)
+
+    def delete(self):
+        if self.vao is not None:
+            glDeleteVertexArrays(1, np.array([self.vao], dtype=np.uint32))
+        glDeleteBuffers(1, np.array([self.vbo], dtype=np.uint32))
+        if self.ebo is not None:
+            glDeleteBuffers(1, np.array([self.ebo], dtype=np.uint32))
+
+
+def build_n_gon_points(shapes, palette):
+    return GL_POINTS, regular_polygon(shapes.n)
+
+
+def build_n_gon_lines(shapes, palette):
+    return GL_LINE_LOOP, regular_polygon(shapes.n)
+
+
+def build_figure1(shapes, palette):
+    return GL_LINE_STRIP, FIGURE1_VERTICES
+
+
+def build_figure2(shapes, palette):
+    return GL_LINE_LOOP, FIGURE2_VERTICES
+
+
+def strip_figure(triangles, face_colors):
+    """ Returns the FigureGeometry arguments of triangles drawn as one
+        indexed triangle strip, each triangle in its own colour.
+    """
+    # primitive restart needs OpenGL 3.1, otherwise the strips are joined by
+    # degenerate triangles
+    mesh = StripMesh(triangles, face_colors,
+                     restart=bool(glPrimitiveRestartIndex))
+    mode = GL_TRIANGLE_STRIP if mesh.mode == 'triangle_strip' else GL_TRIANGLES
+    return {'mode': mode, 'positions': mesh.positions, 'colors': mesh.colors,
+            'indices': mesh.indices, 'restart_index': mesh.restart_index,
+            'flat': True}
+
+
+def build_figure2_triangles(shapes, palette):
+    # one colour per triangle
+    triangles = np.reshape(FIGURE2_TRIANGLES, (-1, 3, 2))
+    return strip_figure(triangles, palette.take(len(triangles)))
+
+
+def build_figure2_triangle_strip(shapes, palette):
+    positions = [vertex for strip in FIGURE2_STRIPS for vertex in strip]
+    counts = [len(strip) for strip in FIGURE2_STRIPS]
+    firsts = np.cumsum([0] + counts[:-1])
+    if shapes.shading_mode == 'smooth':
+        colors = palette.take(len(positions))
+    else:
+        # with flat shading the colour only changes on every second vertex
+        # of a strip
+        colors = np.concatenate([
+            np.repeat(palette.take((count + 1) // 2), 2, axis=0)[:count]
+            for count in counts])
+    return GL_TRIANGLE_STRIP, positions, colors, firsts, counts
+
+
+def build_figure2_triangle_fan(shapes, palette):
+    positions = []
+    colors = []
+    firsts = []
+    counts = []
+    for fan in FIGURE2_FANS:
+        firsts.append(len(positions))
+        counts.append(len(fan['vertices']) + 1)
+        positions.append(fan['center'])
+        positions.extend(fan['vertices'])
+        if shapes.shading_mode == 'smooth':
+            colors.append(palette.take(len(fan['vertices']) + 1))
+        else:
+            # the whole fan has the colour of its center
+            colors.append(np.repeat(palette.take(1), counts[-1], axis=0))
+    return GL_TRIANGLE_FAN, positions, np.concatenate(colors), firsts, counts
+
+
+def build_figure3(shapes, palette):
+    return strip_figure(FIGURE3_TRIANGLES,
+                        palette.take(len(FIGURE3_TRIANGLES)))
+
+
+def build_figure3_back(shapes, palette):
+    # the back faces of the 'filled_front_wire_back' mode are grey
+    return strip_figure(FIGURE3_TRIANGLES,
+                        np.full((len(FIGURE3_TRIANGLES), 3), 0.5))
+
+
+def build_n_gon_fan(shapes, palette):
+    positions = polygon_fan(shapes.n)
+    colors = palette.take(len(positions))
+    return GL_TRIANGLE_FAN, positions, colors
+
+
+BUILDERS = {
+    'n_gon_points': build_n_gon_points,
+    'n_gon_lines': build_n_gon_lines,
+    'figure1': build_figure1,
+    'figure2': build_figure2,
+    'figure2_triangles': build_figure2_triangles,
+    'figure2_triangle_strip': build_figure2_triangle_strip,
+    'figure2_triangle_fan': build_figure2_triangle_fan,
+    'figure3': build_figure3,
+    'figure3_back': build_figure3_back,
+    'n_gon_fan': build_n_gon_fan,
+}
+
+
+class GeometryCache:
+    """ Builds the geometry of the figures on first use and keeps it until
+        shapes.state (the task, n and the modes) changes, i.e. until the
+        palette gets new colours. The colours are taken from shapes.palette
+        in the same order as the immediate mode drawing takes them, so both
+        look the same.
+    """
+
+    def __init__(self):
+        self.figures = dict()
+        self.state = None
+
+    def get(self, name, shapes):
+        if shapes.state != self.state:
+            self.clear()
+            self.state = shapes.state
+        if name not in self.figures:
+            # every figure starts at the first colour, like in a frame
+            shapes.palette.rewind()
+            arguments = BUILDERS[name](shapes, shapes.palette)
+            if isinstance(arguments, dict):
+                self.figures[name] = FigureGeometry(**arguments)
+            else:
+                self.figures[name] = FigureGeometry(*arguments)
+        return self.figures[name]
+
+    def draw(self, name, shapes):
+        self.get(name, shapes).draw()
+
+    def clear(self):
+        for figure in self.figures.values():
+            figure.delete()
+        self.figures.clear()
+        self.state = None
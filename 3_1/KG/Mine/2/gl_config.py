@@ -0,0 +1,145 @@
+""" Startup configuration of PyOpenGL.
+
+    PyOpenGL checks glGetError after every call, logs errors, checks for a
+    current context and silently converts lists and tuples into arrays. The
+    mode is chosen by the GL_MODE environment variable:
+
+    'default'  leaves the PyOpenGL defaults.
+    'release'  disables the error checks, the error logging and the context
+               checks. Passing anything to OpenGL which would need a hidden
+               copy (e.g. a list or an array of the wrong type) raises
+               OpenGL.error.CopyError instead of being converted.
+    'debug'    disables the per call glGetError polling as well, errors are
+               reported by a KHR_debug message callback instead (see
+               enable_debug_output) with the Python stack of the failing
+               call.
+
+    PyOpenGL reads the flags when OpenGL.GL is imported, so configure() has
+    to run before that:
+
+        import gl_config
+        gl_config.configure()
+        from OpenGL.GL import *
+"""
+
+import logging
+import os
+import sys
+import traceback
+
+import OpenGL
+
+MODES = ('default', 'release', 'debug')
+ENVIRONMENT_VARIABLE = 'GL_MODE'
+
+FLAGS = {
+    'default': {},
+    'release': {
+        'ERROR_CHECKING': False,
+        'ERROR_LOGGING': False,
+        'CONTEXT_CHECKING': False,
+        'ERROR_ON_COPY': True,
+    },
+    'debug': {
+        'ERROR_CHECKING': False,
+        'ERROR_LOGGING': False,
+        'CONTEXT_CHECKING': True,
+        'ERROR_ON_COPY': False,
+    },
+}
+
+logger = logging.getLogger(__name__)
+
+# the configured mode, None until configure() ran
+mode = None
+# the installed debug callbacks, ctypes callbacks have to be kept alive
+_callbacks = []
+# the amount of debug messages of the type GL_DEBUG_TYPE_ERROR
+error_count = 0
+
+
+def configure(requested=None):
+    """ Sets the PyOpenGL flags of a mode, once before OpenGL.GL is imported.
+
+        Calling it again with the same mode does nothing, so every entry
+        point can call it.
+
+    Args:
+        requested (str): One of MODES, by default the GL_MODE environment
+            variable or 'default'.
+
+    Returns:
+        str: The configured mode.
+    """
+    global mode
+    if requested is None:
+        requested = os.environ.get(ENVIRONMENT_VARIABLE) or 'default'
+    if requested not in MODES:
+        raise ValueError(f"Unknown GL mode: {requested}")
+    if mode is not None:
+        if requested != mode:
+            raise RuntimeError(
+                f"The GL mode is already {mode!r}, it cannot change to "
+                f"{requested!r}")
+        return mode
+    if 'OpenGL.platform' in sys.modules and requested != 'default':
+        raise RuntimeError("The GL mode has to be configured before "
+                           "OpenGL.GL is imported")
+    for name, value in FLAGS[requested].items():
+        setattr(OpenGL, name, value)
+    mode = requested
+    return mode
+
+
+def _debug_message(source, message_type, message_id, severity, length,
+                   message, user_param):
+    # called by the driver, with synchronous output on the thread of the GL
+    # call which caused the message
+    from OpenGL import GL
+
+    global error_count
+    text = message[:length].decode(errors='replace') \
+        if isinstance(message, bytes) else str(message)
+    if message_type == GL.GL_DEBUG_TYPE_ERROR:
+        error_count += 1
+        stack = ''.join(traceback.format_stack()[:-1])
+        logger.error("GL error %d: %s\n%s", message_id, text, stack)
+    elif severity == GL.GL_DEBUG_SEVERITY_HIGH:
+        logger.warning("GL %d: %s", message_id, text)
+    else:
+        logger.info("GL %d: %s", message_id, text)
+
+
+def enable_debug_output():
+    """ Installs the KHR_debug message callback, needs a current context.
+
+        Notifications are filtered out, they are mostly buffer placement
+        hints.
+
+    Returns:
+        bool: False if the context has no KHR_debug.
+    """
+    from OpenGL import GL
+
+    if not bool(GL.glDebugMessageCallback):
+        logger.warning("KHR_debug is not available, GL errors are not "
+                       "reported in debug mode")
+        return False
+    GL.glEnable(GL.GL_DEBUG_OUTPUT)
+    # the callback runs inside the failing call, so the stack points at it
+    GL.glEnable(GL.GL_DEBUG_OUTPUT_SYNCHRONOUS)
+    callback = GL.GLDEBUGPROC(_debug_message)
+    GL.glDebugMessageCallback(callback, None)
+    _callbacks.append(callback)
+    GL.glDebugMessageControl(GL.GL_DONT_CARE, GL.GL_DONT_CARE,
+                             GL.GL_DEBUG_SEVERITY_NOTIFICATION, 0, None,
+                             GL.GL_FALSE)
+    return True
+
+
+def context_ready():
+    """ Does what the mode needs once a context is current, called by every
+        place creating a context.
+    """
+    if mode == 'debug':
+        enable_debug_output()
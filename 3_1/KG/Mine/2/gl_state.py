@@ -0,0 +1,122 @@
+""" A shadow copy of GL state which skips redundant state changes.
+
+    Every PyOpenGL call costs a Python to C transition and an error check,
+    even if it sets a value the state already has. GLState remembers the
+    values it set and only calls OpenGL if a value changes. The counters
+    show how many calls were issued and how many were suppressed.
+
+    The shadow copy only knows what was set through it. After state was
+    changed directly (e.g. by init_gl or glPopAttrib) reset() forgets the
+    shadowed values, the next call of each setter is issued again.
+"""
+
+from OpenGL.GL import *
+
+# polygon mode faces -> the shadowed faces they set
+POLYGON_FACES = {
+    GL_FRONT: (GL_FRONT,),
+    GL_BACK: (GL_BACK,),
+    GL_FRONT_AND_BACK: (GL_FRONT, GL_BACK),
+}
+
+
+class GLState:
+    """ Sets GL state, skipping calls which would not change it.
+
+    Attributes:
+        issued (int): The calls passed on to OpenGL.
+        suppressed (int): The calls skipped because nothing changed.
+    """
+
+    def __init__(self):
+        self.values = dict()
+        self.issued = 0
+        self.suppressed = 0
+
+    def reset(self):
+        """ Forgets all shadowed values. """
+        self.values.clear()
+
+    def reset_counters(self):
+        self.issued = 0
+        self.suppressed = 0
+
+    def counters(self):
+        """ Returns the issued and suppressed calls and the suppressed
+            fraction.
+        """
+        total = self.issued + self.suppressed
+        return {
+            'issued': self.issued,
+            'suppressed': self.suppressed,
+            'suppressed_fraction': self.suppressed / total if total else 0.0,
+        }
+
+    def _changed(self, key, value):
+        # True if the value differs from the shadowed one, which is updated
+        if key in self.values and self.values[key] == value:
+            self.suppressed += 1
+            return False
+        self.values[key] = value
+        self.issued += 1
+        return True
+
+    def enable(self, capability):
+        if self._changed(('enable', capability), True):
+            glEnable(capability)
+
+    def disable(self, capability):
+        if self._changed(('enable', capability), False):
+            glDisable(capability)
+
+    def set_enabled(self, capability, enabled):
+        if enabled:
+            self.enable(capability)
+        else:
+            self.disable(capability)
+
+    def cull_face(self, mode):
+        if self._changed('cull_face', mode):
+            glCullFace(mode)
+
+    def polygon_mode(self, face, mode):
+        faces = POLYGON_FACES[face]
+        if all(self.values.get(('polygon_mode', shadowed)) == mode
+               for shadowed in faces):
+            self.suppressed += 1
+            return
+        for shadowed in faces:
+            self.values[('polygon_mode', shadowed)] = mode
+        self.issued += 1
+        glPolygonMode(face, mode)
+
+    def line_width(self, width):
+        if self._changed('line_width', float(width)):
+            glLineWidth(width)
+
+    def point_size(self, size):
+        if self._changed('point_size', float(size)):
+            glPointSize(size)
+
+    def shade_model(self, mode):
+        if self._changed('shade_model', mode):
+            glShadeModel(mode)
+
+    def primitive_restart_index(self, index):
+        if self._changed('primitive_restart_index', index):
+            glPrimitiveRestartIndex(index)
+
+    def use_program(self, program):
+        if self._changed('program', program):
+            glUseProgram(program)
+
+    def bind_vertex_array(self, vao):
+        if self._changed('vertex_array', vao):
+            glBindVertexArray(vao)
+
+    def forget(self, *keys):
+        """ Forgets single shadowed values, e.g. ('enable', GL_CULL_FACE) or
+            'program' after a deleted program was in use.
+        """
+        for key in keys:
+            self.values.pop(key, None)
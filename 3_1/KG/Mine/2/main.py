@@ -1,25 +1,54 @@
-import time
+import argparse
 import glfw
+# the PyOpenGL flags of GL_MODE have to be set before OpenGL.GL is imported
+import gl_config
+gl_config.configure()
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import math
-import random
 import numpy as np
 
+from figures import (FIGURE1_VERTICES, FIGURE2_VERTICES, FIGURE2_TRIANGLES,
+                     FIGURE2_STRIPS, FIGURE2_FANS, FIGURE3_TRIANGLES)
+from frame_pacing import FrameScheduler, PACING_MODES
+from geometry import Palette, polygon_fan
+from geometry_cache import GeometryCache
+from gl_state import GLState
+from render_queue import PipelineState, RenderQueue
+from ring_buffer import DynamicFan
+
 class OpenGLShapes:
-    def __init__(self):
+    def __init__(self, retained=True, pacing='on_demand', fps=30, seed=0,
+                 streamed=False):
         self.n = 8
         self.current_task = 1
         self.shading_mode = 'flat'
         self.face_mode = 'normal'
         self.triangle_mode = 'triangle_fan'
         self.window = None
+        # draw the figures from cached vertex buffers instead of glBegin/glEnd
+        self.retained = retained
+        self.geometry = GeometryCache()
+        # draw the n-gon fan from a ring buffer refilled every frame instead,
+        # e.g. for colours which change every frame
+        self.streamed = streamed
+        self.dynamic_fan = None
+        self.scheduler = FrameScheduler(pacing, fps)
+        # colours of the figures, new ones only when the state changes
+        self.palette = Palette(seed=seed)
+        self.state = None
+        # skips state calls which do not change anything
+        self.gl_state = GLState()
+        # the retained draws of a frame, sorted by their state
+        self.queue = RenderQueue(self.gl_state)
         
     def init_glfw(self):
         if not glfw.init():
             raise Exception("GLFW initialization failed")
             
         glfw.window_hint(glfw.SAMPLES, 4)
+        if gl_config.mode == 'debug':
+            glfw.window_hint(glfw.OPENGL_DEBUG_CONTEXT, glfw.TRUE)
         self.window = glfw.create_window(800, 600, "OpenGL Shapes", None, None)
         
         if not self.window:
@@ -27,8 +56,15 @@ class OpenGLShapes:
             raise Exception("Window creation failed")
             
         glfw.make_context_current(self.window)
+        gl_config.context_ready()
         glfw.set_key_callback(self.window, self.key_callback)
+        glfw.set_window_refresh_callback(self.window, self.refresh_callback)
         
+        width, height = glfw.get_framebuffer_size(self.window)
+        self.init_gl(width, height)
+
+    def init_gl(self, width, height):
+        # GL state and projection, shared by the window and offscreen rendering
         glEnable(GL_POINT_SMOOTH)
         glEnable(GL_BLEND)
         glEnable(GL_MULTISAMPLE)
@@ -41,7 +77,6 @@ class OpenGLShapes:
         glEnable(GL_DEPTH_TEST)
         glDepthFunc(GL_LESS)
         
-        width, height = glfw.get_framebuffer_size(self.window)
         glViewport(0, 0, width, height)
         glMatrixMode(GL_PROJECTION)
         glLoadIdentity()
@@ -49,6 +84,22 @@ class OpenGLShapes:
         glMatrixMode(GL_MODELVIEW)
         glLoadIdentity()
         glTranslatef(0.0, 0.0, -5)
+        # the state was set directly, the shadowed values are outdated
+        self.gl_state.reset()
+
+    def update_state(self):
+        # a changed task or mode gets new colours and marks the scene dirty
+        state = (self.current_task, self.n, self.shading_mode, self.face_mode,
+                 self.triangle_mode)
+        if state != self.state:
+            self.state = state
+            self.palette.reset(*state)
+            # the retained geometry holds the colours of the old palette
+            self.geometry.clear()
+            self.scheduler.request_redraw()
+
+    def refresh_callback(self, window):
+        self.scheduler.request_redraw()
 
     def key_callback(self, window, key, scancode, action, mods):
         if action == glfw.PRESS:
@@ -66,7 +117,10 @@ class OpenGLShapes:
                 glfw.set_window_should_close(window, True)
 
     def draw_n_gon_points(self):
-        glPointSize(10.0)
+        self.gl_state.point_size(10.0)
+        if self.retained:
+            self.geometry.draw('n_gon_points', self)
+            return
         glBegin(GL_POINTS)
         for i in range(self.n):
             angle = 2 * math.pi * i / self.n
@@ -76,7 +130,10 @@ class OpenGLShapes:
         glEnd()
 
     def draw_n_gon_lines(self):
-        glLineWidth(2.0)
+        self.gl_state.line_width(2.0)
+        if self.retained:
+            self.geometry.draw('n_gon_lines', self)
+            return
         glBegin(GL_LINE_LOOP)
         for i in range(self.n):
             angle = 2 * math.pi * i / self.n
@@ -86,44 +143,40 @@ class OpenGLShapes:
         glEnd()
 
     def draw_figure1(self):
+        if self.retained:
+            self.geometry.draw('figure1', self)
+            return
         glBegin(GL_LINE_STRIP)
-        vertices = [
-            (-1.8, -0.5), (-1.2, 1), (-0.9, -1.8),
-            (-0.9, 0.4), (0, 0.4), (0, 1), (2, -1)
-        ]
-        for vertex in vertices:
+        for vertex in FIGURE1_VERTICES:
             glVertex2f(*vertex)
         glEnd()
 
     def draw_figure2(self):
+        if self.retained:
+            self.geometry.draw('figure2', self)
+            return
         glBegin(GL_LINE_LOOP)
-        vertices = [
-            (-2, -1), (-1.2, 1.5), (1, 2), (0.5, 1), (2, 1.3), (2, 0.3), (0.5, 0.3), (0.5, -1.4), (-0.7, 0.3)
-        ]
-        for vertex in vertices:
+        for vertex in FIGURE2_VERTICES:
             glVertex2f(*vertex)
         glEnd()
 
     def draw_figure2_triangles(self, primitive_type):
         # Set shading mode
         if self.shading_mode == 'flat':
-            glShadeModel(GL_FLAT)
+            self.gl_state.shade_model(GL_FLAT)
         else:
-            glShadeModel(GL_SMOOTH)
+            self.gl_state.shade_model(GL_SMOOTH)
 
         if primitive_type == 'triangles':
             print("Drawing individual triangles")
-            vertices = [
-                (-2, -1), (-1.2, 1.5), (1, 2),
-                (0.16, 1.16), (-0.7, 0.3), (2, 0.3),
-                (0.5, 1), (2, 1.3), (2, 0.3),
-                (0.16, 1.16), (1, 2), (0.5, 1),
-                (0.5, 0.3), (0.5, -1.4), (-0.7, 0.3)
-            ]
-            
+            if self.retained:
+                self.geometry.draw('figure2_triangles', self)
+                return
+            vertices = FIGURE2_TRIANGLES
+
             glBegin(GL_TRIANGLES)
             for i in range(0, len(vertices), 3):
-                color = (random.random(), random.random(), random.random())
+                color = self.palette.next()
                 for j in range(3):
                     glColor3f(*color)
                     glVertex2f(*vertices[i+j])
@@ -131,210 +184,177 @@ class OpenGLShapes:
 
         elif primitive_type == 'triangle_strip':
             print("Drawing triangle strip")
-            strip1 = [
-                (-2, -1),
-                (-1.2, 1.5), 
-                (-0.7, 0.3),
-                (1, 2),
-                (-1, 0.6),
-                (0.5, 1),    
-            ]
-
-            strip2 = [
-                (2, 1.3),   
-                (2, 0.3),   
-                (-0.5, 0.8),
-                (-1, 0.3), 
-            ]
-
-            strip3 = [
-               (-0.7, 0.3),
-               (0.5, -1.4),
-               (0.5, 0.3),
-            ]
+            if self.retained:
+                self.geometry.draw('figure2_triangle_strip', self)
+                return
 
             def draw_strip(vertices):
                 glBegin(GL_TRIANGLE_STRIP)
-                for vertex in vertices:
+                for i, vertex in enumerate(vertices):
                     if self.shading_mode == 'smooth':
-                        glColor3f(random.random(), random.random(), random.random())
+                        glColor3f(*self.palette.next())
                     else:
                         # For flat shading, color entire primitive
-                        if vertices.index(vertex) % 2 == 0:
-                            glColor3f(random.random(), random.random(), random.random())
+                        if i % 2 == 0:
+                            glColor3f(*self.palette.next())
                     glVertex2f(*vertex)
                 glEnd()
 
-            draw_strip(strip1)
-            draw_strip(strip2)
-            draw_strip(strip3)
+            for strip in FIGURE2_STRIPS:
+                draw_strip(strip)
 
         elif primitive_type == 'triangle_fan':
             print("Drawing triangle fan")
-            fans = [
-                {   
-                    'center': (-0.7, 0.3),
-                    'vertices': [
-                        (-2, -1),
-                        (-1.2, 1.5)
-                    ]
-                },
-                {   
-                    'center': (-1.2, 1.5),
-                    'vertices': [
-                        (-0.7, 0.3),
-                        (1, 2)
-                    ]
-                },
-                {   # Fan 3 (Triangle C)
-                    'center': (-0.7, 0.3),
-                    'vertices': [
-                        (1, 2),
-                        (-1, 0.6)
-                    ]
-                },
-                {   
-                    'center': (-1, 0.6),
-                    'vertices': [
-                        (1, 2),
-                        (0.5, 1)
-                    ]
-                },
-                {   
-                    'center': (-0.5, 0.8),
-                    'vertices': [
-                        (2, 1.3),
-                        (2, 0.3),
-                        (-1, 0.3)
-                    ]
-                },
-                {   
-                    'center': (-0.7, 0.3),
-                    'vertices': [
-                        (0.5, -1.4),
-                        (0.5, 0.3)
-                    ]
-                }
-            ]
+            if self.retained:
+                self.geometry.draw('figure2_triangle_fan', self)
+                return
 
             def draw_fan(center, vertices):
                 glBegin(GL_TRIANGLE_FAN)
                 # Draw center point
-                if not self.shading_mode == 'smooth':
-                    glColor3f(random.random(), random.random(), random.random())
+                glColor3f(*self.palette.next())
                 glVertex2f(*center)
 
                 for vertex in vertices:
                     if self.shading_mode == 'smooth':
-                        glColor3f(random.random(), random.random(), random.random())
+                        glColor3f(*self.palette.next())
                     glVertex2f(*vertex)
                 glEnd()
 
-            for fan in fans:
+            for fan in FIGURE2_FANS:
                 draw_fan(fan['center'], fan['vertices'])
 
+    def submit_figure3(self):
+        # the passes of the face mode as (back, polygon mode, culled faces),
+        # the culled faces are drawn with the same polygon mode as the others
+        passes = {
+            'normal': [(False, GL_FILL, None)],
+            'vertices_front': [(False, GL_POINT, GL_BACK)],
+            'filled_front_wire_back': [(True, GL_LINE, GL_FRONT),
+                                       (False, GL_FILL, GL_BACK)],
+            'wireframe': [(False, GL_LINE, None)],
+        }[self.face_mode]
+        for back, polygon_mode, cull_face in passes:
+            figure = self.geometry.get('figure3_back' if back else 'figure3',
+                                       self)
+            params = ()
+            if polygon_mode == GL_POINT:
+                params = ((self.gl_state.point_size, (5.0,)),)
+            elif polygon_mode == GL_LINE:
+                params = ((self.gl_state.line_width, (1.0,)),)
+            # init_gl enables blending for the smooth points and lines
+            pipeline = PipelineState(polygon_mode=polygon_mode,
+                                     cull_face=cull_face, blend=True)
+            self.queue.submit(pipeline, figure.draw_range(), params)
+
     def draw_figure3(self):
-        triangles = [
-        [(-1.5, -1.5), (-1.0, -0.5), (-0.5, -1.6)],
-        [(-0.71, -1.15), (-0.5, -1.6), (0.5, -1.7)],
-        [(0.5, -1.7), (-0.71, -1.15), (0.7, -1.15)],
-        [(0.0, -1.15), (0.25, 0.52), (0.7, -1.15)],
-        [(0.7, -1.15), (0.25, 0.52), (1.2, 0.42)],
-        [(0.0, -1.15), (0.25, 0.52), (-0.5, 0.6)],
-        [(-1.5, -0.5), (-0.5, 0.6), (-0.5, -0.5)],
-        [(-1.5, -0.5), (-1.5, 0.7), (-0.5, 0.6)],
-        [(-1.5, 0.7), (1.2, 0.42), (-1.5, 0.9)],
-        [(-1.5, 0.9), (1.2, 0.42), (1.25, 0.6)]
-    ]
+        if self.retained:
+            self.submit_figure3()
+            return
+        triangles = FIGURE3_TRIANGLES
+        state = self.gl_state
 
-        if self.face_mode == 'normal':
-            # Normal mode: all faces filled
-            glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
-            
+        def draw_triangles(back=False):
             glBegin(GL_TRIANGLES)
             for triangle in triangles:
-                glColor3f(random.random(), random.random(), random.random())
+                if back:
+                    glColor3f(0.5, 0.5, 0.5)  # Grey color for back faces
+                else:
+                    glColor3f(*self.palette.next())
                 for vertex in triangle:
                     glVertex2f(*vertex)
             glEnd()
+
+        if self.face_mode == 'normal':
+            # Normal mode: all faces filled
+            state.polygon_mode(GL_FRONT_AND_BACK, GL_FILL)
+            
+            draw_triangles()
             
-            glDisable(GL_CULL_FACE)
+            state.disable(GL_CULL_FACE)
 
         elif self.face_mode == 'vertices_front':
             # Mode A: front faces as vertices only
-            glEnable(GL_CULL_FACE)
+            state.enable(GL_CULL_FACE)
             
             # Draw front faces (vertices only)
-            glCullFace(GL_BACK)
-            glPolygonMode(GL_FRONT, GL_POINT)
-            glPointSize(5.0)  # Make vertices more visible
+            state.cull_face(GL_BACK)
+            state.polygon_mode(GL_FRONT, GL_POINT)
+            state.point_size(5.0)  # Make vertices more visible
             
-            glBegin(GL_TRIANGLES)
-            for triangle in triangles:
-                glColor3f(random.random(), random.random(), random.random())
-                for vertex in triangle:
-                    glVertex2f(*vertex)
-            glEnd()
+            draw_triangles()
             
-            glDisable(GL_CULL_FACE)
+            state.disable(GL_CULL_FACE)
 
         elif self.face_mode == 'filled_front_wire_back':
             # Mode B: front faces filled, back faces as wireframe
             
             # First draw back faces as wireframe
-            glEnable(GL_CULL_FACE)
-            glCullFace(GL_FRONT)
-            glPolygonMode(GL_BACK, GL_LINE)
-            glLineWidth(1.0)
+            state.enable(GL_CULL_FACE)
+            state.cull_face(GL_FRONT)
+            state.polygon_mode(GL_BACK, GL_LINE)
+            state.line_width(1.0)
             
-            glBegin(GL_TRIANGLES)
-            for triangle in triangles:
-                glColor3f(0.5, 0.5, 0.5)  # Grey color for back faces
-                for vertex in triangle:
-                    glVertex2f(*vertex)
-            glEnd()
+            draw_triangles(back=True)
             
             # Then draw front faces filled
-            glCullFace(GL_BACK)
-            glPolygonMode(GL_FRONT, GL_FILL)
+            state.cull_face(GL_BACK)
+            state.polygon_mode(GL_FRONT, GL_FILL)
             
-            glBegin(GL_TRIANGLES)
-            for triangle in triangles:
-                glColor3f(random.random(), random.random(), random.random())
-                for vertex in triangle:
-                    glVertex2f(*vertex)
-            glEnd()
+            draw_triangles()
             
-            glDisable(GL_CULL_FACE)
+            state.disable(GL_CULL_FACE)
 
         else: 
             # Mode C: all faces as wireframe
-            glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
-            glLineWidth(1.0)
+            state.polygon_mode(GL_FRONT_AND_BACK, GL_LINE)
+            state.line_width(1.0)
             
-            glBegin(GL_TRIANGLES)
-            for triangle in triangles:
-                glColor3f(random.random(), random.random(), random.random())
-                for vertex in triangle:
-                    glVertex2f(*vertex)
-            glEnd()
+            draw_triangles()
 
     def draw_n_gon_fan(self):
+        if self.streamed:
+            self.draw_streamed_fan()
+            return
+        if self.retained:
+            self.geometry.draw('n_gon_fan', self)
+            return
         glBegin(GL_TRIANGLE_FAN)
+        glColor3f(*self.palette.next())
         glVertex2f(0, 0)  # Center point
         for i in range(self.n + 1):
             angle = 2 * math.pi * i / self.n
             x = math.cos(angle)
             y = math.sin(angle)
-            glColor3f(random.random(), random.random(), random.random())
+            glColor3f(*self.palette.next())
             glVertex2f(x, y)
         glEnd()
 
+    def draw_streamed_fan(self):
+        positions = polygon_fan(self.n)
+        if self.dynamic_fan is None or self.dynamic_fan.count != len(positions):
+            self.delete_dynamic_fan()
+            self.dynamic_fan = DynamicFan(positions)
+        # the fan uses client state, which would end up in a bound VAO
+        self.gl_state.bind_vertex_array(0)
+        self.dynamic_fan.draw(self.palette.take(len(positions)))
+
+    def delete_dynamic_fan(self):
+        if self.dynamic_fan is not None:
+            self.dynamic_fan.delete()
+            self.dynamic_fan = None
+
     def display(self):
+        self.update_state()
+        self.palette.rewind()
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
         glLoadIdentity()
         glTranslatef(0.0, 0.0, -5)
-        
+        if self.current_task not in (7, 8):
+            # only figure 3 changes the polygon mode and the culling, the
+            # other figures are drawn filled
+            self.gl_state.polygon_mode(GL_FRONT_AND_BACK, GL_FILL)
+            self.gl_state.disable(GL_CULL_FACE)
             
         if self.current_task == 1:
             self.draw_n_gon_points()
@@ -351,32 +371,33 @@ class OpenGLShapes:
         elif self.current_task == 7 or self.current_task == 8:
             self.draw_figure3()
 
+        self.queue.flush()
+        # the figures drawn outside the queue bind and unbind their vertex
+        # arrays directly
+        self.gl_state.forget('vertex_array')
+
     def main(self):
         self.init_glfw()
-
-        
-        fps = 30
-        frame_duration = 1.0 / fps
-        
-        while not glfw.window_should_close(self.window):
-            start_time = time.time()
-            
-            self.display()
-            glfw.swap_buffers(self.window)
-            glfw.poll_events()
-            
-            elapsed_time = time.time() - start_time
-            sleep_time = frame_duration - elapsed_time
-            if sleep_time > 0:
-                time.sleep(sleep_time)
+        self.scheduler.start()
         
         while not glfw.window_should_close(self.window):
-            self.display()
-            glfw.swap_buffers(self.window)
-            glfw.poll_events()
+            self.update_state()
+            if self.scheduler.begin_frame():
+                self.display()
+                glfw.swap_buffers(self.window)
+            self.scheduler.end_frame()
             
+        self.geometry.clear()
+        self.delete_dynamic_fan()
         glfw.terminate()
 
 if __name__ == "__main__":
-    app = OpenGLShapes()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pacing', choices=PACING_MODES, default='on_demand')
+    parser.add_argument('--fps', type=float, default=30)
+    parser.add_argument('--streamed', action='store_true',
+                        help="draw the n-gon fan from a ring buffer")
+    args = parser.parse_args()
+    app = OpenGLShapes(pacing=args.pacing, fps=args.fps,
+                       streamed=args.streamed)
     app.main()
\ No newline at end of file
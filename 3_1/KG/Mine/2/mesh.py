@@ -0,0 +1,107 @@
+""" Building indexed meshes out of triangles given by vertex coordinates.
+
+    The figures and examples describe triangles by the coordinates of their
+    vertices, so shared vertices are repeated in every triangle. Welding
+    those vertices gives a compact vertex array and an index array of small
+    integers, which is what the stripification and the GPU upload work with.
+"""
+
+import numpy as np
+
+
+def triangle_coordinates(triangles, dimension=None):
+    """ Converts triangles given by vertex coordinates into an (n, 3, d)
+        array.
+
+    Args:
+        triangles: Either a list of triangles, each a list of three
+            coordinate tuples (like in draw_figure3), a list of flat
+            coordinate lists (like [x0, y0, x1, y1, x2, y2]) or a numpy array
+            of one of those shapes.
+        dimension (int): The amount of coordinates of a vertex. Only needed
+            for flat coordinate lists, otherwise it is taken from the data.
+
+    Returns:
+        numpy.ndarray: The coordinates with the shape (n, 3, d).
+    """
+    coordinates = np.asarray(triangles, dtype=np.float64)
+    if coordinates.ndim == 3:
+        return coordinates
+    if coordinates.ndim == 2:
+        if dimension is None:
+            dimension = coordinates.shape[1] // 3
+        return coordinates.reshape(len(coordinates), 3, dimension)
+    if coordinates.size == 0:
+        return coordinates.reshape(0, 3, dimension or 2)
+    raise ValueError(
+        f"Cannot interpret triangles with shape {coordinates.shape}")
+
+
+def index_dtype(vertex_count):
+    """ Returns the smallest index type for the given amount of vertices.
+
+        The largest value of each type is kept free, it is used as the
+        primitive restart index.
+    """
+    if vertex_count < 0xFFFF:
+        return np.uint16
+    return np.uint32
+
+
+def weld_vertices(points, epsilon=1e-6):
+    """ Merges vertices which are equal up to epsilon.
+
+        The coordinates are snapped to a grid with a cell size of epsilon and
+        vertices in the same cell are merged, the first vertex of a cell is
+        kept. Two vertices closer than epsilon can still end up in
+        neighbouring cells if they lie on different sides of a cell border.
+
+    Args:
+        points (numpy.ndarray): An (n, d) array of vertex coordinates.
+        epsilon (float): The grid cell size, 0 only merges equal vertices.
+
+    Returns:
+        Tuple of numpy.ndarray: The indices of the kept vertices in points
+        (in order of their first occurrence) and for every point the index
+        of its welded vertex.
+    """
+    points = np.asarray(points)
+    if epsilon > 0:
+        keys = np.round(points / epsilon).astype(np.int64)
+    else:
+        keys = points
+    _, first, inverse = np.unique(
+        keys, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+
+    # np.unique sorts the vertices, reorder them by their first occurrence
+    # to keep vertices of neighbouring triangles close to each other
+    order = np.argsort(first, kind="stable")
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    return first[order], remap[inverse]
+
+
+def build_indexed_mesh(triangles, dimension=None, epsilon=1e-6,
+                       dtype=np.float32):
+    """ Builds an indexed mesh out of triangles given by vertex coordinates.
+
+    Args:
+        triangles: The triangles, see triangle_coordinates.
+        dimension (int): The amount of coordinates of a vertex, only needed
+            for flat coordinate lists.
+        epsilon (float): Vertices closer than this are welded, see
+            weld_vertices.
+        dtype: The type of the vertex coordinates.
+
+    Returns:
+        Tuple of numpy.ndarray: The (m, d) vertex array and the (n, 3) index
+        array, which is uint16 or uint32 depending on the vertex count.
+    """
+    coordinates = triangle_coordinates(triangles, dimension)
+    points = coordinates.reshape(-1, coordinates.shape[2])
+    kept, inverse = weld_vertices(points, epsilon)
+
+    vertices = np.ascontiguousarray(points[kept], dtype=dtype)
+    indices = inverse.astype(index_dtype(len(vertices))).reshape(-1, 3)
+    return vertices, indices
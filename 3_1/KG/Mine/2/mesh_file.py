@@ -0,0 +1,421 @@
+""" Versioned binary mesh files which are loaded without copying.
+
+    Layout (little endian), every block starts at a multiple of ALIGNMENT:
+
+    header    HEADER: magic, version, index size (2 or 4 bytes), dimension,
+              floats per vertex, vertex count, index count, strip index count
+    vertices  float32 (vertex count, floats per vertex), the positions
+              followed by the colour if the vertex has more floats than the
+              dimension (like the x, y, r, g, b vertices of FigureGeometry)
+    indices   uint16 or uint32 triangle list
+    strips    optional strip indices of the same type, separated by the
+              primitive restart index (the largest value of the type)
+
+    MeshFile only reads the header and maps the blocks with numpy.memmap, so
+    a file opens in constant time. The mapped blocks are passed to
+    glBufferData as they are, the pages are read from disk by the upload.
+
+    Meshes are converted from triangle lists (like the figures), OBJ files
+    and PLY files.
+"""
+
+import argparse
+import os
+import struct
+import tempfile
+
+import numpy as np
+from OpenGL.GL import *
+
+from mesh import build_indexed_mesh, index_dtype
+from strip_cache import cached_stripify
+from strip_mesh import orient_strips
+
+# magic, version, index size, dimension, floats per vertex, vertex count,
+# index count, strip index count
+HEADER = struct.Struct("<4sHHIIQQQ")
+MAGIC = b"VMSH"
+VERSION = 1
+ALIGNMENT = 64
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _block_offsets(vertex_bytes, index_bytes):
+    # the offsets of the vertex, index and strip blocks
+    vertex_offset = _aligned(HEADER.size)
+    index_offset = _aligned(vertex_offset + vertex_bytes)
+    strip_offset = _aligned(index_offset + index_bytes)
+    return vertex_offset, index_offset, strip_offset
+
+
+def strip_indices(indices, method="greedy", dtype=None, **params):
+    """ Returns the strips of a triangle list as one index array separated by
+        the primitive restart index, with the winding of every triangle.
+    """
+    indices = np.asarray(indices).reshape(-1, 3)
+    dtype = np.dtype(dtype or indices.dtype)
+    restart_index = np.iinfo(dtype).max
+    strips = cached_stripify(indices, method, join=False, **params)
+    strips, _ = orient_strips(strips, indices)
+    elements = []
+    for strip in strips:
+        if len(elements) > 0:
+            elements.append(restart_index)
+        elements.extend(strip)
+    return np.asarray(elements, dtype=dtype)
+
+
+def save_mesh(path, vertices, indices, colors=None, strips=True):
+    """ Writes a mesh file.
+
+        The file is written to a temporary file first and renamed, so
+        readers never see a partial file.
+
+    Args:
+        path (str): The file to write.
+        vertices (array like): The (m, d) vertex positions.
+        indices (array like): The (n, 3) vertex indices of the triangles.
+        colors (array like): Optional (m, 3) vertex colours.
+        strips (bool or array like): True computes the strip block, False
+            leaves it out, an array is stored as it is.
+    """
+    positions = np.asarray(vertices, dtype=np.float32)
+    if positions.ndim != 2:
+        raise ValueError("The vertices have to be an (m, d) array")
+    dimension = positions.shape[1]
+    data = positions
+    if colors is not None:
+        colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+        data = np.hstack([positions, colors])
+    data = np.ascontiguousarray(data)
+
+    dtype = index_dtype(len(data))
+    indices = np.asarray(indices).reshape(-1, 3)
+    if len(indices) > 0 and int(indices.max()) >= len(data):
+        raise ValueError("An index is larger than the vertex count")
+    indices = np.ascontiguousarray(indices, dtype=dtype).ravel()
+    if strips is True:
+        strips = strip_indices(indices.reshape(-1, 3), dtype=dtype)
+    elif strips is False or strips is None:
+        strips = np.zeros(0, dtype=dtype)
+    strips = np.ascontiguousarray(strips, dtype=dtype)
+
+    header = HEADER.pack(MAGIC, VERSION, dtype().itemsize, dimension,
+                         data.shape[1], len(data), len(indices), len(strips))
+    offsets = _block_offsets(data.nbytes, indices.nbytes)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as file:
+            file.write(header)
+            for offset, block in zip(offsets, (data, indices, strips)):
+                file.write(b"\0" * (offset - file.tell()))
+                file.write(block.tobytes())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def _map(path, dtype, offset, shape):
+    # numpy.memmap cannot map zero bytes
+    if int(np.prod(shape)) == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+
+class MeshFile:
+    """ A memory-mapped mesh file.
+
+    Args:
+        path (str): The file written by save_mesh.
+
+    Attributes:
+        vertices (numpy.memmap): The (m, floats per vertex) vertex block.
+        indices (numpy.memmap): The flat triangle list.
+        strips (numpy.memmap): The flat strip indices, empty if the file has
+            no strips.
+        dimension (int): The amount of coordinates of a vertex.
+        restart_index (int): The primitive restart index of the strips.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is not a mesh file")
+        (magic, version, index_size, self.dimension, components,
+         vertex_count, index_count, strip_count) = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a mesh file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported mesh file version {version}")
+        if index_size not in (2, 4):
+            raise ValueError(f"Unsupported index size {index_size}")
+
+        dtype = np.uint16 if index_size == 2 else np.uint32
+        self.restart_index = int(np.iinfo(dtype).max)
+        offsets = _block_offsets(vertex_count * components * 4,
+                                 index_count * index_size)
+        expected = offsets[2] + strip_count * index_size
+        if os.path.getsize(path) < expected:
+            raise ValueError(f"{path} is truncated")
+        self.vertices = _map(path, np.float32, offsets[0],
+                             (vertex_count, components))
+        self.indices = _map(path, dtype, offsets[1], (index_count,))
+        self.strips = _map(path, dtype, offsets[2], (strip_count,))
+
+    @property
+    def positions(self):
+        return self.vertices[:, :self.dimension]
+
+    @property
+    def colors(self):
+        """ The vertex colours or None. """
+        if self.vertices.shape[1] == self.dimension:
+            return None
+        return self.vertices[:, self.dimension:]
+
+    @property
+    def stride(self):
+        return self.vertices.shape[1] * self.vertices.itemsize
+
+    @property
+    def index_type(self):
+        return (GL_UNSIGNED_SHORT if self.indices.dtype == np.uint16
+                else GL_UNSIGNED_INT)
+
+    def elements(self, strips=True):
+        """ Returns the primitive type and the indices to draw, the strips if
+            the file has them and strips is True.
+        """
+        if strips and len(self.strips) > 0:
+            return GL_TRIANGLE_STRIP, self.strips
+        return GL_TRIANGLES, self.indices
+
+    def upload(self, strips=True, usage=GL_STATIC_DRAW):
+        """ Creates a vertex and an element buffer straight from the mapped
+            blocks.
+
+        Returns:
+            Tuple: The vertex buffer, the element buffer, the primitive type
+            and the index count.
+        """
+        mode, elements = self.elements(strips)
+        vbo, ebo = glGenBuffers(2)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices,
+                     usage)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, ebo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, elements.nbytes, elements,
+                     usage)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        return vbo, ebo, mode, len(elements)
+
+
+def convert_triangles(path, triangles, dimension=None, vertex_colors=None,
+                      strips=True):
+    """ Writes triangles given by vertex coordinates (like the figures) as a
+        mesh file, equal vertices are welded.
+
+    Args:
+        path (str): The file to write.
+        triangles: The triangles, see mesh.triangle_coordinates.
+        dimension (int): The amount of coordinates, only needed for flat
+            coordinate lists.
+        vertex_colors (array like): Optional (n * 3, 3) colour of every
+            triangle corner, welded vertices keep the colour of their first
+            corner.
+        strips (bool): Whether the strip block is computed.
+    """
+    vertices, indices = build_indexed_mesh(triangles, dimension)
+    colors = None
+    if vertex_colors is not None:
+        corners = np.asarray(vertex_colors, dtype=np.float32).reshape(-1, 3)
+        colors = np.zeros((len(vertices), 3), dtype=np.float32)
+        # the first corner of every vertex
+        used, first = np.unique(indices.ravel(), return_index=True)
+        colors[used] = corners[first]
+    save_mesh(path, vertices, indices, colors, strips)
+
+
+def _triangulate(polygon):
+    # splits a convex polygon into a fan around its first vertex
+    return [(polygon[0], polygon[i], polygon[i + 1])
+            for i in range(1, len(polygon) - 1)]
+
+
+def read_obj(path):
+    """ Reads the positions and faces of a Wavefront OBJ file, polygons are
+        triangulated as fans.
+
+    Returns:
+        Tuple of numpy.ndarray: The (m, 3) float32 positions and the (n, 3)
+        indices.
+    """
+    positions = []
+    faces = []
+    with open(path) as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 0:
+                continue
+            if parts[0] == "v":
+                positions.append([float(value) for value in parts[1:4]])
+            elif parts[0] == "f":
+                # v, v/vt, v//vn or v/vt/vn, negative indices count from the
+                # last vertex
+                polygon = []
+                for part in parts[1:]:
+                    index = int(part.split("/")[0])
+                    polygon.append(index - 1 if index > 0
+                                   else len(positions) + index)
+                faces.extend(_triangulate(polygon))
+    return (np.asarray(positions, dtype=np.float32).reshape(-1, 3),
+            np.asarray(faces, dtype=np.int64).reshape(-1, 3))
+
+
+# PLY property types
+PLY_TYPES = {
+    "char": "i1", "int8": "i1", "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2", "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4", "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4", "double": "f8", "float64": "f8",
+}
+
+
+def read_ply(path):
+    """ Reads the positions and faces of an ASCII or binary PLY file,
+        polygons are triangulated as fans. Vertex colours (red, green, blue)
+        are read if present.
+
+    Returns:
+        Tuple of numpy.ndarray: The (m, 3) float32 positions, the (n, 3)
+        indices and the (m, 3) float32 colours in [0, 1] or None.
+    """
+    with open(path, "rb") as file:
+        if file.readline().strip() != b"ply":
+            raise ValueError(f"{path} is not a PLY file")
+        encoding = None
+        elements = []
+        while True:
+            line = file.readline()
+            if not line:
+                raise ValueError(f"{path} has no end_header")
+            parts = line.decode("ascii").split()
+            if len(parts) == 0 or parts[0] in ("comment", "obj_info"):
+                continue
+            if parts[0] == "format":
+                encoding = parts[1]
+            elif parts[0] == "element":
+                elements.append((parts[1], int(parts[2]), []))
+            elif parts[0] == "property":
+                elements[-1][2].append(parts[1:])
+            elif parts[0] == "end_header":
+                break
+
+        if encoding == "ascii":
+            tokens = iter(file.read().split())
+
+            def read(type_name, count):
+                return np.array([next(tokens) for _ in range(count)],
+                                dtype=np.float64).astype(PLY_TYPES[type_name])
+        elif encoding in ("binary_little_endian", "binary_big_endian"):
+            order = "<" if encoding == "binary_little_endian" else ">"
+
+            def read(type_name, count):
+                dtype = np.dtype(order + PLY_TYPES[type_name])
+                return np.frombuffer(file.read(dtype.itemsize * count), dtype)
+        else:
+            raise ValueError(f"Unsupported PLY format {encoding}")
+
+        positions = colors = None
+        faces = []
+        for name, count, properties in elements:
+            if all(prop[0] != "list" for prop in properties):
+                # rows of scalars are read at once
+                rows = _read_rows(read, encoding, properties, count)
+                if name == "vertex":
+                    positions = np.stack([rows[axis] for axis in "xyz"],
+                                         axis=1).astype(np.float32)
+                    channels = ("red", "green", "blue")
+                    if all(channel in rows.dtype.names
+                           for channel in channels):
+                        colors = np.stack([rows[channel] for channel in
+                                           channels], axis=1)
+                        colors = colors.astype(np.float32)
+                        if rows["red"].dtype.kind in "iu":
+                            colors /= 255
+                continue
+            for _ in range(count):
+                for prop in properties:
+                    if prop[0] != "list":
+                        read(prop[0], 1)
+                        continue
+                    length = int(read(prop[1], 1)[0])
+                    values = read(prop[2], length).tolist()
+                    if name == "face" and prop[3] in ("vertex_indices",
+                                                      "vertex_index"):
+                        faces.extend(_triangulate(values))
+    if positions is None:
+        raise ValueError(f"{path} has no vertices")
+    return (positions, np.asarray(faces, dtype=np.int64).reshape(-1, 3),
+            colors)
+
+
+def _read_rows(read, encoding, properties, count):
+    # reads count rows of scalar properties as a structured array
+    if encoding == "ascii":
+        dtype = np.dtype([(prop[1], PLY_TYPES[prop[0]])
+                          for prop in properties])
+        values = read("double", count * len(properties)).reshape(
+            count, len(properties))
+        rows = np.zeros(count, dtype=dtype)
+        for column, prop in enumerate(properties):
+            rows[prop[1]] = values[:, column]
+        return rows
+    order = "<" if encoding == "binary_little_endian" else ">"
+    dtype = np.dtype([(prop[1], order + PLY_TYPES[prop[0]])
+                      for prop in properties])
+    # the rows are read as bytes and reinterpreted
+    data = read("uchar", dtype.itemsize * count)
+    return np.frombuffer(data, dtype=dtype, count=count)
+
+
+def convert_file(source, path, strips=True):
+    """ Converts an .obj or .ply file into a mesh file. """
+    extension = os.path.splitext(source)[1].lower()
+    colors = None
+    if extension == ".obj":
+        positions, faces = read_obj(source)
+    elif extension == ".ply":
+        positions, faces, colors = read_ply(source)
+    else:
+        raise ValueError(f"Unknown mesh format: {extension}")
+    save_mesh(path, positions, faces, colors, strips)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert an OBJ or PLY file into a binary mesh file.")
+    parser.add_argument("source", help=".obj or .ply file")
+    parser.add_argument("output", help="mesh file to write")
+    parser.add_argument("--no-strips", action="store_true",
+                        help="do not store precomputed strips")
+    args = parser.parse_args()
+
+    convert_file(args.source, args.output, strips=not args.no_strips)
+    mesh = MeshFile(args.output)
+    print(f"{len(mesh.vertices)} vertices, {len(mesh.indices) // 3} "
+          f"triangles, {len(mesh.strips)} strip indices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+""" Offscreen rendering without a visible window.
+
+    The frames are rendered into a framebuffer object and read back with
+    glReadPixels. On machines without a display the context is a
+    surfaceless EGL context (e.g. Mesa llvmpipe), otherwise a hidden GLFW
+    window provides the context.
+
+    PyOpenGL chooses its platform on the first OpenGL import, so this module
+    has to be imported before main (or anything else importing OpenGL), or
+    PYOPENGL_PLATFORM=egl has to be set in the environment:
+
+        import offscreen
+        pixels = offscreen.render_task(5, frames=10, triangle_mode='triangles')
+"""
+
+import argparse
+import ctypes
+import os
+import sys
+import time
+
+# the platform is fixed once OpenGL.platform is imported, importing the
+# OpenGL package itself (e.g. to set its flags, see gl_config) is fine
+if "OpenGL.platform" not in sys.modules and not (
+        os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+    os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+if os.environ.get("PYOPENGL_PLATFORM") == "egl":
+    # lets Mesa create a context without any window system
+    os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+# the PyOpenGL flags of GL_MODE have to be set before OpenGL.GL is imported
+import gl_config
+gl_config.configure()
+
+import numpy as np
+from OpenGL import platform
+from OpenGL.GL import *
+
+
+def default_backend():
+    """ Returns 'egl' if PyOpenGL uses EGL, otherwise 'glfw'. """
+    if type(platform.PLATFORM).__name__ == "EGLPlatform":
+        return "egl"
+    return "glfw"
+
+
+class OffscreenContext:
+    """ An OpenGL context with a framebuffer object to render into.
+
+    Args:
+        width (int): The width of the framebuffer in pixels.
+        height (int): The height of the framebuffer in pixels.
+        core (bool): If True, a 3.3 core profile context is created,
+            otherwise a compatibility context for the fixed function
+            pipeline.
+        samples (int): The amount of samples for multisampling, 0 disables
+            it. Multisampled frames are resolved before they are read.
+        backend (str): 'egl' or 'glfw', by default the one matching the
+            PyOpenGL platform.
+    """
+
+    def __init__(self, width=800, height=600, core=False, samples=0,
+                 backend=None):
+        self.width = width
+        self.height = height
+        self.samples = samples
+        self.backend = backend or default_backend()
+        self.display = None
+        self.context = None
+        self.window = None
+
+        if self.backend == "egl":
+            self._create_egl_context(core)
+        elif self.backend == "glfw":
+            self._create_glfw_context(core)
+        else:
+            raise ValueError(f"Unknown backend {self.backend!r}")
+        gl_config.context_ready()
+
+        self.framebuffers = []
+        self.renderbuffers = []
+        self.fbo = self._create_framebuffer(samples)
+        # multisampled renderbuffers can't be read directly, they are
+        # resolved into a second framebuffer first
+        self.resolve_fbo = self.fbo
+        if samples > 0:
+            self.resolve_fbo = self._create_framebuffer(0)
+        self.bind()
+
+    def _create_egl_context(self, core):
+        from OpenGL.raw.EGL import _errors
+        if not hasattr(_errors, "_error_checker"):
+            # PyOpenGL 3.1 does not define it with ERROR_CHECKING disabled
+            _errors._error_checker = None
+        from OpenGL import EGL
+
+        self.display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        if not EGL.eglInitialize(self.display, ctypes.pointer(major),
+                                 ctypes.pointer(minor)):
+            raise RuntimeError("EGL initialization failed")
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+
+        attributes = []
+        if core:
+            attributes += [EGL.EGL_CONTEXT_MAJOR_VERSION, 3,
+                           EGL.EGL_CONTEXT_MINOR_VERSION, 3,
+                           EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK,
+                           EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT]
+        if gl_config.mode == "debug":
+            attributes += [EGL.EGL_CONTEXT_OPENGL_DEBUG, EGL.EGL_TRUE]
+        attributes.append(EGL.EGL_NONE)
+        # no config (EGL_KHR_no_config_context) and no surface, everything
+        # is drawn into the FBO
+        self.context = EGL.eglCreateContext(
+            self.display, None, EGL.EGL_NO_CONTEXT,
+            (EGL.EGLint * len(attributes))(*attributes))
+        if not self.context:
+            raise RuntimeError("EGL context creation failed")
+        EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE,
+                           EGL.EGL_NO_SURFACE, self.context)
+
+    def _create_glfw_context(self, core):
+        import glfw
+
+        if not glfw.init():
+            raise Exception("GLFW initialization failed")
+        glfw.window_hint(glfw.VISIBLE, glfw.FALSE)
+        if core:
+            glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+            glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+            glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+        if gl_config.mode == "debug":
+            glfw.window_hint(glfw.OPENGL_DEBUG_CONTEXT, glfw.TRUE)
+        self.window = glfw.create_window(self.width, self.height, "Offscreen",
+                                         None, None)
+        if not self.window:
+            glfw.terminate()
+            raise Exception("Window creation failed")
+        glfw.make_context_current(self.window)
+
+    def _create_framebuffer(self, samples):
+        fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, fbo)
+        color, depth = glGenRenderbuffers(2)
+        for renderbuffer, storage, attachment in (
+                (color, GL_RGBA8, GL_COLOR_ATTACHMENT0),
+                (depth, GL_DEPTH24_STENCIL8, GL_DEPTH_STENCIL_ATTACHMENT)):
+            glBindRenderbuffer(GL_RENDERBUFFER, renderbuffer)
+            glRenderbufferStorageMultisample(GL_RENDERBUFFER, samples, storage,
+                                             self.width, self.height)
+            glFramebufferRenderbuffer(GL_FRAMEBUFFER, attachment,
+                                      GL_RENDERBUFFER, renderbuffer)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Framebuffer incomplete: {status}")
+        self.framebuffers.append(fbo)
+        self.renderbuffers.extend([color, depth])
+        return fbo
+
+    def bind(self):
+        """ Makes the framebuffer the render target. """
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.width, self.height)
+
+    def read_pixels(self, out=None):
+        """ Waits for the rendering and returns the framebuffer.
+
+        Args:
+            out (numpy.ndarray): Optional (height, width, 4) uint8 array to
+                read into.
+
+        Returns:
+            numpy.ndarray: A (height, width, 4) RGBA uint8 array, row 0 is
+                the top of the image.
+        """
+        if self.resolve_fbo != self.fbo:
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self.fbo)
+            glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self.resolve_fbo)
+            glBlitFramebuffer(0, 0, self.width, self.height,
+                              0, 0, self.width, self.height,
+                              GL_COLOR_BUFFER_BIT, GL_NEAREST)
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.resolve_fbo)
+        if out is None:
+            out = np.empty((self.height, self.width, 4), dtype=np.uint8)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glReadPixels(0, 0, self.width, self.height, GL_RGBA,
+                     GL_UNSIGNED_BYTE, array=out)
+        self.bind()
+        # glReadPixels starts at the bottom row
+        return out[::-1]
+
+    def render(self, draw, frames=1, keep_frames=True):
+        """ Calls draw once per frame and reads the frames back.
+
+        Args:
+            draw (callable): Draws one frame, called without arguments.
+            frames (int): The amount of frames.
+            keep_frames (bool): If True, every frame is read back, otherwise
+                only the last one.
+
+        Returns:
+            numpy.ndarray: A (frames, height, width, 4) uint8 array, or a
+                (1, height, width, 4) array if keep_frames is False.
+        """
+        count = frames if keep_frames else 1
+        pixels = np.empty((count, self.height, self.width, 4), dtype=np.uint8)
+        self.bind()
+        for frame in range(frames):
+            draw()
+            if keep_frames or frame == frames - 1:
+                pixels[min(frame, count - 1)] = self.read_pixels()
+        return pixels
+
+    def delete(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        glDeleteRenderbuffers(len(self.renderbuffers),
+                              np.array(self.renderbuffers, dtype=np.uint32))
+        glDeleteFramebuffers(len(self.framebuffers),
+                             np.array(self.framebuffers, dtype=np.uint32))
+        if self.backend == "egl":
+            from OpenGL import EGL
+
+            EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE,
+                               EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            EGL.eglDestroyContext(self.display, self.context)
+        else:
+            import glfw
+
+            glfw.destroy_window(self.window)
+            glfw.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.delete()
+
+
+def render_task(task, frames=1, width=800, height=600, retained=True,
+                samples=0, keep_frames=True, **settings):
+    """ Renders an OpenGLShapes task offscreen.
+
+    Args:
+        task (int): The task 1 to 8 (current_task).
+        frames (int): The amount of frames to render.
+        width (int): The width of the image.
+        height (int): The height of the image.
+        retained (bool): Draw from vertex buffers or with glBegin/glEnd.
+        samples (int): The amount of samples for multisampling.
+        keep_frames (bool): If False, only the last frame is returned.
+        **settings: Other attributes of OpenGLShapes, e.g. n, shading_mode,
+            face_mode or triangle_mode.
+
+    Returns:
+        numpy.ndarray: A (frames, height, width, 4) RGBA uint8 array.
+    """
+    from main import OpenGLShapes
+
+    with OffscreenContext(width, height, samples=samples) as context:
+        shapes = OpenGLShapes(retained=retained)
+        shapes.current_task = task
+        for name, value in settings.items():
+            if not hasattr(shapes, name):
+                raise AttributeError(f"OpenGLShapes has no setting {name!r}")
+            setattr(shapes, name, value)
+        shapes.init_gl(width, height)
+        pixels = context.render(shapes.display, frames, keep_frames)
+        shapes.geometry.clear()
+    return pixels
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render an OpenGLShapes task without a window.")
+    parser.add_argument("task", type=int, choices=range(1, 9))
+    parser.add_argument("--frames", type=int, default=1)
+    parser.add_argument("--size", type=int, nargs=2, default=(800, 600),
+                        metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--immediate", action="store_true",
+                        help="draw with glBegin/glEnd")
+    parser.add_argument("--n", type=int, default=8)
+    parser.add_argument("--shading-mode", default="flat")
+    parser.add_argument("--face-mode", default="normal")
+    parser.add_argument("--triangle-mode", default="triangle_fan")
+    parser.add_argument("--output", help="save the last frame as .npy")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pixels = render_task(args.task, args.frames, *args.size,
+                         retained=not args.immediate, keep_frames=False,
+                         n=args.n, shading_mode=args.shading_mode,
+                         face_mode=args.face_mode,
+                         triangle_mode=args.triangle_mode)
+    elapsed = time.perf_counter() - start
+    print(f"{args.frames} frames in {elapsed:.3f} s "
+          f"({args.frames / elapsed:.1f} FPS)")
+    if args.output:
+        np.save(args.output, pixels[-1])
+
+
+if __name__ == "__main__":
+    main()
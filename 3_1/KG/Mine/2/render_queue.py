@@ -0,0 +1,296 @@
+""" A render queue which sorts draws by pipeline state and merges them.
+
+    Draws are submitted as (state, geometry, params) during a frame and
+    issued by flush(). Every submission gets a packed 64 bit sort key:
+
+    bit  62      blend (opaque draws first, blended ones after them)
+    bits 61..46  program
+    bits 45..26  vertex array object
+    bits 25..24  polygon mode
+    bits 23..22  cull mode
+    bits 21..18  primitive type
+
+    Sorting by the key groups the draws by the most expensive state change
+    first. Neighbouring draws with the same key, element type, primitive
+    restart index, shading and params use the same buffers and state, they
+    are merged into one glMultiDrawArrays or glMultiDrawElements call. The state is set through
+    a GLState, so only real changes reach OpenGL.
+
+    Blended draws are sorted like the opaque ones, a scene which needs them
+    back to front submits them in their own flush().
+"""
+
+import ctypes
+
+import numpy as np
+
+if __name__ == "__main__":
+    # run as a script the module draws its example without a window, the
+    # EGL platform has to be chosen before OpenGL is imported
+    import offscreen
+from OpenGL.GL import *
+
+from gl_state import GLState
+
+BLEND_SHIFT = 62
+PROGRAM_SHIFT = 46
+VAO_SHIFT = 26
+POLYGON_SHIFT = 24
+CULL_SHIFT = 22
+PRIMITIVE_SHIFT = 18
+PROGRAM_BITS = 16
+VAO_BITS = 20
+
+POLYGON_MODES = (GL_FILL, GL_LINE, GL_POINT)
+CULL_MODES = (None, GL_BACK, GL_FRONT, GL_FRONT_AND_BACK)
+PRIMITIVE_TYPES = (GL_POINTS, GL_LINES, GL_LINE_LOOP, GL_LINE_STRIP,
+                   GL_TRIANGLES, GL_TRIANGLE_STRIP, GL_TRIANGLE_FAN)
+
+
+class PipelineState:
+    """ The state a draw needs.
+
+    Args:
+        program (int): The shader program, 0 for the fixed function pipeline.
+        polygon_mode: GL_FILL, GL_LINE or GL_POINT for both faces.
+        cull_face: None to disable culling, otherwise the culled faces.
+        blend (bool): Whether blending is enabled, with the blend function
+            set up front (e.g. by init_gl).
+    """
+
+    def __init__(self, program=0, polygon_mode=GL_FILL, cull_face=None,
+                 blend=False):
+        if program >= 1 << PROGRAM_BITS:
+            raise ValueError(f"Program {program} does not fit the sort key")
+        self.program = program
+        self.polygon_mode = polygon_mode
+        self.cull_face = cull_face
+        self.blend = blend
+
+    def key(self, vao, primitive):
+        """ Returns the packed sort key of a draw with this state. """
+        if vao >= 1 << VAO_BITS:
+            raise ValueError(f"Vertex array {vao} does not fit the sort key")
+        return (int(self.blend) << BLEND_SHIFT |
+                int(self.program) << PROGRAM_SHIFT |
+                int(vao) << VAO_SHIFT |
+                POLYGON_MODES.index(self.polygon_mode) << POLYGON_SHIFT |
+                CULL_MODES.index(self.cull_face) << CULL_SHIFT |
+                PRIMITIVE_TYPES.index(primitive) << PRIMITIVE_SHIFT)
+
+    def apply(self, state):
+        """ Sets the state through a GLState. """
+        state.use_program(self.program)
+        state.polygon_mode(GL_FRONT_AND_BACK, self.polygon_mode)
+        if self.cull_face is None:
+            state.disable(GL_CULL_FACE)
+        else:
+            state.enable(GL_CULL_FACE)
+            state.cull_face(self.cull_face)
+        state.set_enabled(GL_BLEND, self.blend)
+
+
+def unpack_key(key):
+    """ Returns the (blend, program, vao, polygon mode, cull mode, primitive)
+        of a sort key.
+    """
+    return (bool(key >> BLEND_SHIFT & 1),
+            key >> PROGRAM_SHIFT & ((1 << PROGRAM_BITS) - 1),
+            key >> VAO_SHIFT & ((1 << VAO_BITS) - 1),
+            POLYGON_MODES[key >> POLYGON_SHIFT & 3],
+            CULL_MODES[key >> CULL_SHIFT & 3],
+            PRIMITIVE_TYPES[key >> PRIMITIVE_SHIFT & 15])
+
+
+class DrawRange:
+    """ A range of a vertex array object to draw.
+
+    Args:
+        vao (int): The vertex array object with the buffers and the arrays.
+        primitive: The primitive type, one of PRIMITIVE_TYPES.
+        first (int): The first vertex, or the byte offset of the first index
+            in the element buffer if index_type is given.
+        count (int): The amount of vertices or indices.
+        index_type: None to draw vertices, otherwise GL_UNSIGNED_SHORT or
+            GL_UNSIGNED_INT.
+        restart_index (int): The primitive restart index of the indices or
+            None.
+        flat (bool): If True, the range is drawn with flat shading, see
+            geometry_cache.FigureGeometry.
+    """
+
+    def __init__(self, vao, primitive, first, count, index_type=None,
+                 restart_index=None, flat=False):
+        self.vao = vao
+        self.primitive = primitive
+        self.first = first
+        self.count = count
+        self.index_type = index_type
+        self.restart_index = restart_index
+        self.flat = flat
+
+    def merge_key(self):
+        """ What has to be equal besides the sort key to merge two draws. """
+        return self.index_type, self.restart_index, self.flat
+
+
+class RenderQueue:
+    """ Collects the draws of a frame and issues them sorted and merged.
+
+    Args:
+        state (GLState): The shadowed GL state, a new one by default.
+
+    Attributes:
+        submitted (int): The draws submitted since the last flush.
+        draw_calls (int): The draw calls of the last flush.
+    """
+
+    def __init__(self, state=None):
+        self.state = state if state is not None else GLState()
+        self.items = []
+        self.submitted = 0
+        self.draw_calls = 0
+
+    def submit(self, state, geometry, params=()):
+        """ Adds a draw.
+
+        Args:
+            state (PipelineState): The state of the draw.
+            geometry (DrawRange): What to draw.
+            params (tuple): (function, args) pairs called before the draw,
+                e.g. ((glColor3f, (1, 0, 0)),). Only draws with equal params
+                are merged, so the args have to be scalars (not arrays).
+        """
+        key = state.key(geometry.vao, geometry.primitive)
+        self.items.append((key, len(self.items), state, geometry,
+                           tuple(params)))
+
+    def _batches(self, sort):
+        # the (sorted) draws split into runs which one multi draw can issue
+        if sort:
+            self.items.sort(key=lambda item: (item[0], item[1]))
+        batch = []
+        for item in self.items:
+            if batch:
+                key, _, _, geometry, params = batch[-1]
+                if (item[0] != key or item[4] != params or
+                        item[3].merge_key() != geometry.merge_key()):
+                    yield batch
+                    batch = []
+            batch.append(item)
+        if batch:
+            yield batch
+
+    def flush(self, sort=True):
+        """ Issues all submitted draws and empties the queue.
+
+        Args:
+            sort (bool): If False, the draws are issued in the submitted
+                order and only neighbouring draws are merged, e.g. to
+                compare with the sorted order.
+
+        Returns:
+            dict: The submitted draws and the issued draw calls.
+        """
+        self.draw_calls = 0
+        for batch in self._batches(sort):
+            _, _, state, geometry, params = batch[0]
+            state.apply(self.state)
+            self.state.bind_vertex_array(geometry.vao)
+            restart = geometry.restart_index is not None
+            self.state.set_enabled(GL_PRIMITIVE_RESTART, restart)
+            if restart:
+                self.state.primitive_restart_index(geometry.restart_index)
+            for function, args in params:
+                function(*args)
+            if geometry.flat:
+                glPushAttrib(GL_LIGHTING_BIT)
+                glShadeModel(GL_FLAT)
+            self._draw(geometry, [item[3] for item in batch])
+            if geometry.flat:
+                glPopAttrib()
+            self.draw_calls += 1
+        # like FigureGeometry.draw, draws outside the queue expect primitive
+        # restart to be disabled
+        self.state.disable(GL_PRIMITIVE_RESTART)
+
+        self.submitted = len(self.items)
+        self.items.clear()
+        return {'submitted': self.submitted, 'draw_calls': self.draw_calls}
+
+    def _draw(self, geometry, ranges):
+        mode = geometry.primitive
+        if len(ranges) == 1:
+            if geometry.index_type is None:
+                glDrawArrays(mode, geometry.first, geometry.count)
+            else:
+                glDrawElements(mode, geometry.count, geometry.index_type,
+                               ctypes.c_void_p(geometry.first))
+            return
+        counts = np.array([r.count for r in ranges], dtype=np.int32)
+        if geometry.index_type is None:
+            firsts = np.array([r.first for r in ranges], dtype=np.int32)
+            glMultiDrawArrays(mode, firsts, counts, len(ranges))
+        else:
+            offsets = (ctypes.c_void_p * len(ranges))(
+                *[r.first for r in ranges])
+            glMultiDrawElements(mode, counts, geometry.index_type, offsets,
+                                len(ranges))
+
+    def clear(self):
+        self.items.clear()
+
+
+def example(size=20):
+    import offscreen
+    from geometry_cache import FigureGeometry
+
+    # size x size quads in one vertex buffer, drawn one by one with random
+    # polygon and cull modes
+    rng = np.random.default_rng(0)
+    x, y = np.meshgrid(np.arange(size), np.arange(size))
+    corners = np.array([[0, 0], [0.8, 0], [0.8, 0.8], [0, 0.8]])
+    positions = ((np.stack([x.ravel(), y.ravel()], axis=1)[:, None] + corners)
+                 * 2.0 / size - 1.0).reshape(-1, 2)
+    colors = np.repeat(rng.random((size * size, 3)), 4, axis=0)
+    quads = np.arange(size * size)
+    indices = (quads[:, None] * 4 + [0, 1, 2, 0, 2, 3]).astype(np.uint32)
+    states = [PipelineState(polygon_mode=mode, cull_face=cull)
+              for mode in (GL_FILL, GL_LINE) for cull in (None, GL_BACK)]
+    choices = rng.integers(len(states), size=size * size)
+
+    with offscreen.OffscreenContext(400, 400) as context:
+        glLineWidth(1.0)
+        figure = FigureGeometry(GL_TRIANGLE_FAN, positions, colors,
+                                indices=indices.ravel())
+        for name, indexed in (('arrays', False), ('elements', True)):
+            frames = []
+            for sort in (False, True):
+                queue = RenderQueue()
+
+                def draw():
+                    glClear(GL_COLOR_BUFFER_BIT)
+                    for quad, choice in zip(quads, choices):
+                        if indexed:
+                            geometry = DrawRange(figure.vao, GL_TRIANGLES,
+                                                 int(quad) * 6 * 4, 6,
+                                                 GL_UNSIGNED_INT)
+                        else:
+                            geometry = DrawRange(figure.vao, GL_TRIANGLE_FAN,
+                                                 int(quad) * 4, 4)
+                        queue.submit(states[choice], geometry)
+                    queue.flush(sort)
+
+                queue.state.reset_counters()
+                frames.append(context.render(draw)[-1])
+                counters = queue.state.counters()
+                print(f"{name}, {'sorted' if sort else 'submitted order'}: "
+                      f"{queue.submitted} draws in {queue.draw_calls} calls, "
+                      f"{counters['issued']} state calls")
+            print(f"{name}: the images are equal: "
+                  f"{np.array_equal(frames[0], frames[1])}")
+        figure.delete()
+
+
+if __name__ == "__main__":
+    example()
@@ -0,0 +1,276 @@
+""" Streaming of per-frame vertex data through a mapped ring buffer.
+
+    Geometry which changes every frame (e.g. random colours) would otherwise
+    be drawn in immediate mode or reallocated with glBufferData for every
+    update. A RingBuffer allocates one buffer with REGIONS regions once. Each
+    frame writes into the next region through NumPy views of the mapped
+    memory, while the GPU may still read the regions of the previous frames.
+    A fence sync after the draw calls of a frame marks when its region can be
+    written again, the CPU only waits if it is REGIONS frames ahead.
+
+    With glBufferStorage (OpenGL 4.4 or ARB_buffer_storage) the buffer is
+    mapped once, persistent and coherent. Otherwise every frame maps its
+    region with glMapBufferRange, unsynchronized (the fence already ensures
+    the GPU is done) and invalidated (the old content is not needed).
+
+    Usage:
+
+        ring = RingBuffer(size)
+        ring.begin_frame()
+        offset = ring.write(colors)
+        ring.finish_writes()
+        ... draw from ring.buffer at offset ...
+        ring.end_frame()
+"""
+
+import ctypes
+import time
+
+import numpy as np
+
+if __name__ == "__main__":
+    # the example runs headless, offscreen picks the PyOpenGL platform for
+    # that and has to come before the first OpenGL import
+    import offscreen
+from OpenGL.GL import *
+
+REGIONS = 3
+# offsets of allocations are aligned to this, enough for any vertex type
+ALIGNMENT = 256
+# the timeout of a single glClientWaitSync call
+WAIT_TIMEOUT_NS = 1_000_000
+
+
+def _aligned(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _view(address, size):
+    # a writable uint8 array over mapped memory, nothing is copied
+    return np.ctypeslib.as_array((ctypes.c_ubyte * size).from_address(address))
+
+
+class RingBuffer:
+    """ A buffer with a region for each frame in flight.
+
+    Args:
+        size (int): The bytes a single frame can write.
+        target: The buffer binding target used for mapping.
+        regions (int): The amount of regions, 3 is triple buffering.
+        persistent (bool): Whether to use a persistent mapping, by default if
+            glBufferStorage is available.
+
+    Attributes:
+        buffer: The buffer object, bind it to draw from the written data.
+        persistent (bool): Whether the buffer is persistently mapped.
+        waits (int): How often the CPU had to wait for the GPU.
+        wait_ns (int): The total time spent waiting.
+    """
+
+    def __init__(self, size, target=GL_ARRAY_BUFFER, regions=REGIONS,
+                 persistent=None):
+        if size <= 0 or regions <= 0:
+            raise ValueError("size and regions must be positive")
+        if persistent is None:
+            persistent = bool(glBufferStorage)
+        self.target = target
+        self.region_size = _aligned(size)
+        self.regions = regions
+        self.persistent = persistent
+        total = self.region_size * regions
+
+        self.buffer = glGenBuffers(1)
+        glBindBuffer(target, self.buffer)
+        self.memory = None
+        if persistent:
+            flags = GL_MAP_WRITE_BIT | GL_MAP_PERSISTENT_BIT | \
+                GL_MAP_COHERENT_BIT
+            glBufferStorage(target, total, None, flags)
+            address = glMapBufferRange(target, 0, total, flags)
+            if not address:
+                raise RuntimeError("Mapping the ring buffer failed")
+            self.memory = _view(address, total)
+        else:
+            glBufferData(target, total, None, GL_STREAM_DRAW)
+        glBindBuffer(target, 0)
+
+        self.fences = [None] * regions
+        self.region = regions - 1
+        self.cursor = 0
+        self.mapped = None
+        self.waits = 0
+        self.wait_ns = 0
+
+    @property
+    def region_offset(self):
+        """ The byte offset of the current region in the buffer. """
+        return self.region * self.region_size
+
+    def _wait(self, fence):
+        status = glClientWaitSync(fence, 0, 0)
+        if status in (GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED):
+            return
+        self.waits += 1
+        start = time.perf_counter_ns()
+        # the first wait flushes, so the fence is guaranteed to signal
+        flags = GL_SYNC_FLUSH_COMMANDS_BIT
+        while status not in (GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED):
+            if status == GL_WAIT_FAILED:
+                raise RuntimeError("Waiting for the ring buffer fence failed")
+            status = glClientWaitSync(fence, flags, WAIT_TIMEOUT_NS)
+            flags = 0
+        self.wait_ns += time.perf_counter_ns() - start
+
+    def begin_frame(self):
+        """ Switches to the next region, after the GPU is done reading it. """
+        self.region = (self.region + 1) % self.regions
+        self.cursor = 0
+        fence = self.fences[self.region]
+        if fence is not None:
+            self._wait(fence)
+            glDeleteSync(fence)
+            self.fences[self.region] = None
+
+        if self.persistent:
+            start = self.region_offset
+            self.mapped = self.memory[start:start + self.region_size]
+        else:
+            glBindBuffer(self.target, self.buffer)
+            address = glMapBufferRange(
+                self.target, self.region_offset, self.region_size,
+                GL_MAP_WRITE_BIT | GL_MAP_UNSYNCHRONIZED_BIT |
+                GL_MAP_INVALIDATE_RANGE_BIT)
+            glBindBuffer(self.target, 0)
+            if not address:
+                raise RuntimeError("Mapping the ring buffer failed")
+            self.mapped = _view(address, self.region_size)
+
+    def allocate(self, shape, dtype=np.float32):
+        """ Reserves space in the current region.
+
+        Returns:
+            Tuple: The byte offset in the buffer and a NumPy array of the
+            given shape over the mapped memory. The array is only valid until
+            finish_writes.
+        """
+        if self.mapped is None:
+            raise RuntimeError("allocate needs begin_frame first")
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        if self.cursor + size > self.region_size:
+            raise ValueError(
+                f"The frame writes more than {self.region_size} bytes")
+        start = self.cursor
+        self.cursor = _aligned(start + size)
+        array = self.mapped[start:start + size].view(dtype).reshape(shape)
+        return self.region_offset + start, array
+
+    def write(self, data):
+        """ Copies an array into the current region.
+
+        Returns:
+            int: The byte offset of the data in the buffer.
+        """
+        data = np.asarray(data)
+        offset, array = self.allocate(data.shape, data.dtype)
+        array[...] = data
+        return offset
+
+    def finish_writes(self):
+        """ Ends the writes of the frame, needed before drawing. """
+        if not self.persistent and self.mapped is not None:
+            glBindBuffer(self.target, self.buffer)
+            glUnmapBuffer(self.target)
+            glBindBuffer(self.target, 0)
+        self.mapped = None
+
+    def end_frame(self):
+        """ Marks the region as in use by the draw calls issued so far. """
+        self.finish_writes()
+        self.fences[self.region] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE,
+                                               0)
+
+    def delete(self):
+        for fence in self.fences:
+            if fence is not None:
+                glDeleteSync(fence)
+        self.fences = [None] * self.regions
+        glBindBuffer(self.target, self.buffer)
+        if self.persistent:
+            glUnmapBuffer(self.target)
+        glBindBuffer(self.target, 0)
+        glDeleteBuffers(1, np.array([self.buffer], dtype=np.uint32))
+        self.memory = self.mapped = None
+
+
+class DynamicFan:
+    """ A triangle fan whose colours change every frame, e.g. the n-gon fan
+        with random colours, drawn from a RingBuffer instead of glBegin.
+
+    Args:
+        positions (array like): The (n, 2) vertices, the centre first.
+        persistent (bool): See RingBuffer.
+    """
+
+    def __init__(self, positions, persistent=None):
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 2)
+        self.count = len(positions)
+        self.positions = positions
+        # x, y, r, g, b per vertex, the positions are written once per frame
+        # as well so a frame is one contiguous block
+        self.ring = RingBuffer(self.count * 5 * 4, persistent=persistent)
+
+    def draw(self, colors):
+        """ Draws the fan with (n, 3) vertex colours. """
+        ring = self.ring
+        ring.begin_frame()
+        offset, vertices = ring.allocate((self.count, 5))
+        vertices[:, :2] = self.positions
+        vertices[:, 2:] = colors
+        ring.finish_writes()
+
+        glBindBuffer(GL_ARRAY_BUFFER, ring.buffer)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 20, ctypes.c_void_p(offset))
+        glColorPointer(3, GL_FLOAT, 20, ctypes.c_void_p(offset + 8))
+        glDrawArrays(GL_TRIANGLE_FAN, 0, self.count)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        ring.end_frame()
+
+    def delete(self):
+        self.ring.delete()
+
+
+def example(n=10000, frames=300):
+    import math
+
+    import offscreen
+
+    angles = 2 * math.pi * np.arange(n + 1) / n
+    positions = np.vstack([[0, 0], np.stack([np.cos(angles), np.sin(angles)],
+                                            axis=1)])
+    rng = np.random.default_rng(0)
+    with offscreen.OffscreenContext(400, 400) as context:
+        for persistent in (True, False):
+            if persistent and not bool(glBufferStorage):
+                continue
+            fan = DynamicFan(positions, persistent)
+
+            def draw():
+                glClear(GL_COLOR_BUFFER_BIT)
+                fan.draw(rng.random((len(positions), 3), dtype=np.float32))
+
+            start = time.perf_counter()
+            context.render(draw, frames, keep_frames=False)
+            elapsed = time.perf_counter() - start
+            print(f"{'persistent' if persistent else 'map range'}: "
+                  f"{frames / elapsed:.0f} FPS, waited {fan.ring.waits} "
+                  f"times for {fan.ring.wait_ns / 1e6:.1f} ms")
+            fan.delete()
+
+
+if __name__ == "__main__":
+    example()
@@ -0,0 +1,200 @@
+""" Cache of computed triangle strips.
+
+    The strips are keyed by a hash of the index array of the mesh together
+    with the stripification method and its parameters. Results are kept in
+    memory and stored as .npy files in a cache directory, the least recently
+    used files are deleted when the directory grows over its size limit.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from triangle_strip import stripify
+
+DEFAULT_DIRECTORY = os.path.join(
+    os.path.expanduser("~"), ".cache", "triangle_strips")
+
+# parameters which do not change the found strips
+IGNORED_PARAMETERS = {"workers", "block_size"}
+
+# separates two strips in a stored file
+SEPARATOR = -1
+
+VERSION = 1
+
+
+def strip_key(indices, method, **params):
+    """ Returns the cache key of the strips of an index array.
+
+    Args:
+        indices (array like): The (n, 3) index array of the mesh.
+        method (str): The stripification method, see triangle_strip.stripify.
+        **params: The parameters of the method.
+
+    Returns:
+        str: The key as hex string.
+    """
+    indices = np.ascontiguousarray(indices, dtype=np.int64).reshape(-1, 3)
+    params = {name: value for name, value in params.items()
+              if name not in IGNORED_PARAMETERS}
+    digest = hashlib.sha256()
+    digest.update(f"{VERSION}:{method}:{len(indices)}:".encode())
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    digest.update(indices.tobytes())
+    return digest.hexdigest()
+
+
+def encode_strips(strips):
+    """ Packs a list of strips into one int64 array, separated by -1. """
+    parts = []
+    for strip in strips:
+        if len(parts) > 0:
+            parts.append([SEPARATOR])
+        parts.append(strip)
+    if len(parts) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(
+        [np.asarray(part, dtype=np.int64) for part in parts])
+
+
+def decode_strips(data):
+    """ Unpacks an array created by encode_strips. """
+    if len(data) == 0:
+        return []
+    # every part but the first starts with a separator
+    parts = np.split(data, np.flatnonzero(data == SEPARATOR))
+    return [parts[0].tolist()] + [part[1:].tolist() for part in parts[1:]]
+
+
+class StripCache:
+    """ Two level (memory and disk) least recently used cache of strips.
+
+    Args:
+        directory (str): The directory of the stored strips or None to only
+            cache in memory.
+        max_bytes (int): The maximum size of all stored files.
+        memory_size (int): The maximum amount of results kept in memory.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=256 * 2 ** 20,
+                 memory_size=64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_size = memory_size
+        self.memory = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def get(self, key):
+        """ Returns the stored strips of a key or None. """
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+
+        if self.directory is not None:
+            path = self.path(key)
+            try:
+                strips = decode_strips(np.load(path, mmap_mode="r"))
+            except (OSError, ValueError):
+                strips = None
+            if strips is not None:
+                # touch the file, the modification time is used for the
+                # least recently used eviction
+                os.utime(path)
+                self._remember(key, strips)
+                self.hits += 1
+                return strips
+
+        self.misses += 1
+        return None
+
+    def put(self, key, strips):
+        """ Stores the strips of a key. """
+        self._remember(key, strips)
+        if self.directory is None:
+            return
+
+        # write into a temporary file first, so other processes never read
+        # half written files
+        handle, temporary = tempfile.mkstemp(dir=self.directory,
+                                             suffix=".tmp")
+        with os.fdopen(handle, "wb") as file:
+            np.save(file, encode_strips(strips))
+        os.replace(temporary, self.path(key))
+        self.evict()
+
+    def evict(self):
+        """ Deletes the least recently used files above the size limit. """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npy"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        """ Removes all cached strips. """
+        self.memory.clear()
+        if self.directory is not None:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".npy"):
+                    os.remove(entry.path)
+
+    def _remember(self, key, strips):
+        self.memory[key] = strips
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def stripify(self, indices, method="greedy", **params):
+        """ Same as triangle_strip.stripify for an index array, but loads the
+            result from the cache if possible.
+        """
+        indices = np.asarray(indices).reshape(-1, 3)
+        key = strip_key(indices, method, **params)
+        # the methods return a single strip unless join is False
+        join = params.get("join", True)
+
+        strips = self.get(key)
+        if strips is None:
+            result = stripify(indices, method, **params)
+            strips = [result] if join else result
+            self.put(key, strips)
+
+        if join:
+            return list(strips[0]) if len(strips) > 0 else []
+        return [list(strip) for strip in strips]
+
+
+_default_cache = None
+
+
+def cached_stripify(indices, method="greedy", **params):
+    """ Stripifies an index array using a shared StripCache in the default
+        directory.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = StripCache()
+    return _default_cache.stripify(indices, method, **params)
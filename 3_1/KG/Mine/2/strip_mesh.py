@@ -0,0 +1,264 @@
+""" Triangle lists converted into a single indexed triangle strip.
+
+    The triangles are welded into an indexed mesh, stripified and the strips
+    are written into one index array, separated by the primitive restart
+    index or joined by degenerate triangles. Drawn as GL_TRIANGLE_STRIP from
+    a GL_ELEMENT_ARRAY_BUFFER this needs one draw call and about one index
+    per triangle instead of three.
+
+    Small or badly connected meshes can need more strip indices than
+    GL_TRIANGLES, then the index array is a plain triangle list instead.
+
+    The strips keep the winding of every triangle, so face culling works as
+    with GL_TRIANGLES. Colours of whole triangles are stored in the
+    provoking (last) vertex of each triangle and drawn with flat shading.
+"""
+
+import numpy as np
+
+from mesh import build_indexed_mesh, index_dtype
+from strip_cache import StripCache
+from triangle_strip import join_strips
+
+# drawing the figures never writes into the user's home directory, a disk
+# cache is only used if one is passed in
+_memory_cache = StripCache(directory=None)
+
+
+def _same_winding(a, b):
+    # True if the triangle b is a rotation of the triangle a
+    return b in ((a[0], a[1], a[2]), (a[1], a[2], a[0]), (a[2], a[0], a[1]))
+
+
+def orient_strips(strips, faces):
+    """ Splits strips where a triangle would be drawn with the wrong
+        winding, so every triangle keeps the winding of its face.
+
+        OpenGL swaps the first two vertices of every second triangle of a
+        strip. Along a consistently oriented mesh this keeps the winding, so
+        only faces with the opposite orientation of their neighbour start a
+        new strip, or are drawn as a triangle of their own.
+
+    Args:
+        strips (list of lists): Strips over the vertex indices of the faces.
+        faces (array like): The (n, 3) vertex indices of the faces.
+
+    Returns:
+        Tuple of lists: The oriented strips and for every strip the face
+        index of each of its triangles (None for degenerate triangles).
+
+    Raises:
+        ValueError: If a strip has a triangle which is not a face or the
+            strips miss a face. Faces covered more than once (e.g. by the
+            exact search) are dropped, the strip is split around them.
+    """
+    faces = [tuple(face) for face in np.asarray(faces).tolist()]
+    # faces by their vertex set, faces with the same vertices but opposite
+    # windings (two sided triangles) are told apart by their winding
+    unassigned = dict()
+    for i, face in enumerate(faces):
+        unassigned.setdefault(frozenset(face), []).append(i)
+
+    def take_face(triangle):
+        # the face of a triangle, None if all its faces are drawn already
+        key = frozenset(triangle)
+        if key not in unassigned:
+            raise ValueError(f"The strip triangle {triangle} is not a face")
+        candidates = unassigned[key]
+        for position, i in enumerate(candidates):
+            if _same_winding(faces[i], triangle):
+                return candidates.pop(position)
+        return candidates.pop() if candidates else None
+
+    oriented = []
+    strip_faces = []
+    for strip in strips:
+        # the current strip starts at strip[start], current holds the faces
+        # of its triangles
+        start = 0
+        current = []
+        for k in range(len(strip) - 2):
+            a, b, c = strip[k:k + 3]
+            if len({a, b, c}) < 3:
+                current.append(None)
+                continue
+            drawn = (a, b, c) if (k - start) % 2 == 0 else (b, a, c)
+            i = take_face(drawn)
+            if i is not None and _same_winding(faces[i], drawn):
+                current.append(i)
+                continue
+
+            # end the current strip before this triangle
+            if k > start:
+                oriented.append(strip[start:k + 2])
+                strip_faces.append(current)
+            if i is None:
+                # the face is drawn already, the next strip starts after it
+                start = k + 1
+                current = []
+            elif _same_winding(faces[i], (a, b, c)):
+                # a new strip starting here draws the triangle as (a, b, c)
+                start = k
+                current = [i]
+            else:
+                # the triangle is drawn alone with swapped vertices
+                oriented.append([b, a, c])
+                strip_faces.append([i])
+                start = k + 1
+                current = []
+        if len(strip) - start >= 3:
+            oriented.append(strip[start:])
+            strip_faces.append(current)
+    missing = sum(map(len, unassigned.values()))
+    if missing > 0:
+        raise ValueError(f"The strips miss {missing} of {len(faces)} faces")
+    return oriented, strip_faces
+
+
+class StripMesh:
+    """ A triangle list as vertex arrays and one triangle strip index array.
+
+    Args:
+        triangles: The triangles, see mesh.triangle_coordinates.
+        face_colors (array like): Optional (n, 3) colour of every triangle.
+        method (str): The stripification method, see triangle_strip.stripify.
+        restart (bool): If True, the strips are separated by the primitive
+            restart index, otherwise they are joined by degenerate triangles.
+            Degenerate triangles show up as lines with glPolygonMode GL_LINE.
+        fallback (bool): If True, a triangle list is used when it needs
+            fewer indices than the strip.
+        cache (StripCache): The cache of the strips, by default one only
+            kept in memory.
+        dimension (int): The amount of coordinates of a vertex, only needed
+            for flat coordinate lists.
+        **params: Parameters of the stripification method.
+
+    Attributes:
+        positions (numpy.ndarray): The (m, d) float32 vertex positions.
+        colors (numpy.ndarray): The (m, 3) float32 vertex colours or None.
+        indices (numpy.ndarray): The uint16 or uint32 strip indices.
+        mode (str): 'triangle_strip' or 'triangles' for the fallback.
+        restart_index (int): The primitive restart index or None.
+        triangle_count (int): The amount of triangles.
+    """
+
+    def __init__(self, triangles, face_colors=None, method="greedy",
+                 restart=True, fallback=True, dimension=None, cache=None,
+                 **params):
+        if cache is None:
+            cache = _memory_cache
+        vertices, faces = build_indexed_mesh(triangles, dimension)
+        self.triangle_count = len(faces)
+        strips = cache.stripify(faces, method, join=False, **params)
+        strips, strip_faces = orient_strips(strips, faces)
+
+        self.mode = "triangle_strip"
+        # separators between the strips, they need one index with restart and
+        # two or three without
+        separators = (1 if restart else 3) * (len(strips) - 1)
+        if fallback and sum(map(len, strips)) + separators >= 3 * len(faces):
+            # every triangle is a strip of its own
+            self.mode = "triangles"
+            strips = faces.tolist()
+            strip_faces = [[i] for i in range(len(faces))]
+
+        self.positions = vertices
+        self.colors = None
+        if face_colors is not None:
+            strips = self._provoking_colors(strips, strip_faces, face_colors)
+
+        dtype = index_dtype(len(self.positions))
+        self.restart_index = None
+        if self.mode == "triangles":
+            elements = [v for strip in strips for v in strip]
+        elif restart:
+            self.restart_index = int(np.iinfo(dtype).max)
+            elements = []
+            for strip in strips:
+                if len(elements) > 0:
+                    elements.append(self.restart_index)
+                elements.extend(strip)
+        else:
+            elements = join_strips(strips)
+        self.indices = np.asarray(elements, dtype=dtype)
+
+    def _provoking_colors(self, strips, strip_faces, face_colors):
+        # every vertex gets the colour of the triangle it provokes. A welded
+        # vertex provoking triangles of different colours is duplicated,
+        # vertices which provoke nothing keep the colour of their first copy.
+        face_colors = np.asarray(face_colors, dtype=np.float32)
+        keys = dict()
+        positions = []
+        colors = []
+
+        def vertex(index, face):
+            key = (index, face)
+            if key not in keys:
+                keys[key] = len(positions)
+                positions.append(index)
+                colors.append(face_colors[face] if face is not None
+                              else face_colors[0])
+            return keys[key]
+
+        first_face = dict()
+        for strip, faces in zip(strips, strip_faces):
+            for v, face in zip(strip[2:], faces):
+                if face is not None:
+                    first_face.setdefault(v, face)
+        colored = []
+        for strip, faces in zip(strips, strip_faces):
+            result = [vertex(v, first_face.get(v)) for v in strip[:2]]
+            result += [vertex(v, first_face.get(v) if face is None else face)
+                       for v, face in zip(strip[2:], faces)]
+            colored.append(result)
+
+        self.positions = self.positions[positions]
+        self.colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+        return colored
+
+    @property
+    def vertex_count(self):
+        return len(self.positions)
+
+    def savings(self):
+        """ Returns the index counts of the strip and of GL_TRIANGLES.
+
+        Returns:
+            dict: triangles, the vertices of GL_TRIANGLES and of the strip
+                (restart indices and degenerate joins included), the unique
+                vertices and the saved fraction of the vertices.
+        """
+        listed = 3 * self.triangle_count
+        return {
+            'triangles': self.triangle_count,
+            'triangle_list_vertices': listed,
+            'strip_vertices': len(self.indices),
+            'mode': self.mode,
+            'unique_vertices': self.vertex_count,
+            'saved': 1.0 - len(self.indices) / listed if listed else 0.0,
+        }
+
+
+def example():
+    from figures import FIGURE2_TRIANGLES, FIGURE3_TRIANGLES
+    from geometry import grid_triangles
+
+    rows = columns = 100
+    x, y = np.meshgrid(np.arange(columns + 1), np.arange(rows + 1))
+    grid = np.stack([x.ravel(), y.ravel()], axis=1)[grid_triangles(rows,
+                                                                   columns)]
+    for name, triangles in (
+            ('figure 2', np.reshape(FIGURE2_TRIANGLES, (-1, 3, 2))),
+            ('figure 3', FIGURE3_TRIANGLES),
+            ('100x100 grid', grid)):
+        for restart in (True, False):
+            counts = StripMesh(triangles, restart=restart).savings()
+            print(f"{name} ({'restart' if restart else 'degenerate'}): "
+                  f"{counts['strip_vertices']} instead of "
+                  f"{counts['triangle_list_vertices']} vertices for "
+                  f"{counts['triangles']} triangles as {counts['mode']}, "
+                  f"{counts['saved']:.0%} saved")
+
+
+if __name__ == "__main__":
+    example()
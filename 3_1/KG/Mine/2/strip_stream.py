@@ -0,0 +1,242 @@
+""" Stripification of meshes which do not fit into memory.
+
+    The mesh is read from two raw binary files, an (n, 3) index array and an
+    (m, d) vertex array, which are memory-mapped and only read in chunks.
+
+    1. The bounding box of the vertices is computed chunk by chunk.
+    2. Every triangle is sorted into a cell of a regular grid by its
+       centroid. The cells are written to temporary bucket files, so the
+       triangles of a cell lie close together.
+    3. Neighbouring cells are stripified together, up to chunk_size
+       triangles at once, and the strips are appended to the output file.
+
+    The output is a flat uint32 index array, the strips are separated by the
+    primitive restart index 0xFFFFFFFF and keep the winding of their
+    triangles. The peak memory depends on chunk_size, not on the mesh size.
+    Strips end at the cell borders, which costs a few indices per cell.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from strip_mesh import orient_strips
+from triangle_strip import stripify
+
+RESTART_INDEX = 0xFFFFFFFF
+# the average size of a grid cell relative to a chunk, several small cells
+# are stripified together
+CELL_FRACTION = 8
+
+
+def open_mesh(index_path, vertex_path, dimension=3, index_type=np.uint32,
+              vertex_type=np.float32):
+    """ Memory-maps a mesh stored as raw index and vertex files.
+
+    Returns:
+        Tuple of numpy.memmap: The (n, 3) indices and the (m, dimension)
+        vertices.
+    """
+    indices = np.memmap(index_path, dtype=index_type, mode="r")
+    vertices = np.memmap(vertex_path, dtype=vertex_type, mode="r")
+    if indices.size % 3 != 0 or vertices.size % dimension != 0:
+        raise ValueError("The file sizes do not fit the mesh layout")
+    return indices.reshape(-1, 3), vertices.reshape(-1, dimension)
+
+
+def write_mesh(index_path, vertex_path, indices, vertices):
+    """ Writes a mesh as raw uint32 index and float32 vertex files. """
+    np.ascontiguousarray(indices, dtype=np.uint32).tofile(index_path)
+    np.ascontiguousarray(vertices, dtype=np.float32).tofile(vertex_path)
+
+
+def read_strips(path):
+    """ Memory-maps a strip file written by stream_stripify. """
+    return np.memmap(path, dtype=np.uint32, mode="r")
+
+
+def _bounds(vertices, chunk_size):
+    low = np.full(vertices.shape[1], np.inf)
+    high = np.full(vertices.shape[1], -np.inf)
+    for start in range(0, len(vertices), chunk_size):
+        chunk = np.asarray(vertices[start:start + chunk_size])
+        low = np.minimum(low, chunk.min(axis=0))
+        high = np.maximum(high, chunk.max(axis=0))
+    return low, high
+
+
+class _Buckets:
+    # triangles sorted into one temporary file per grid cell. The triangles
+    # are buffered in memory and appended to the files once chunk_size
+    # triangles are buffered, so the buffers stay bounded.
+
+    def __init__(self, directory, chunk_size):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.buffered = dict()
+        self.count = 0
+        self.cells = set()
+
+    def path(self, cell):
+        return os.path.join(self.directory, f"{cell}.bin")
+
+    def add(self, cells, faces):
+        order = np.argsort(cells, kind="stable")
+        cells = cells[order]
+        faces = faces[order]
+        boundaries = np.flatnonzero(np.diff(cells)) + 1
+        for group in np.split(np.arange(len(cells)), boundaries):
+            if len(group) == 0:
+                continue
+            cell = int(cells[group[0]])
+            self.buffered.setdefault(cell, []).append(faces[group])
+            self.cells.add(cell)
+        self.count += len(faces)
+        if self.count >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        for cell, parts in self.buffered.items():
+            with open(self.path(cell), "ab") as file:
+                for part in parts:
+                    part.tofile(file)
+        self.buffered.clear()
+        self.count = 0
+
+
+def _stripify_chunk(faces, method, params):
+    # stripifies the triangles of one chunk with local vertex ids and returns
+    # the strips with the ids of the file
+    vertex_ids, local = np.unique(faces, return_inverse=True)
+    local = local.reshape(-1, 3)
+    strips = stripify(local, method, join=False, **params)
+    strips, _ = orient_strips(strips, local)
+    return [vertex_ids[strip] for strip in strips]
+
+
+def stream_stripify(index_path, vertex_path, output_path, dimension=3,
+                    chunk_size=1 << 18, method="greedy", temp_dir=None,
+                    index_type=np.uint32, vertex_type=np.float32, **params):
+    """ Stripifies a memory-mapped mesh chunk by chunk.
+
+    Args:
+        index_path (str): The raw (n, 3) index file.
+        vertex_path (str): The raw (m, dimension) vertex file.
+        output_path (str): The strip file to write, see read_strips.
+        dimension (int): The amount of coordinates of a vertex.
+        chunk_size (int): The amount of triangles in memory at once.
+        method (str): The stripification method, see triangle_strip.stripify.
+        temp_dir (str): Where the bucket files are written, by default the
+            directory of the output file.
+        index_type: The type of the indices in the index file.
+        vertex_type: The type of the coordinates in the vertex file.
+        **params: Parameters of the stripification method.
+
+    Returns:
+        dict: The amount of triangles, strips and written indices.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    indices, vertices = open_mesh(index_path, vertex_path, dimension,
+                                  index_type, vertex_type)
+    triangle_count = len(indices)
+    if temp_dir is None:
+        temp_dir = os.path.dirname(os.path.abspath(output_path))
+
+    # cells of about CELL_FRACTION of a chunk over the axes the mesh extends
+    # in, a flat mesh gets a 2d grid
+    low, high = _bounds(vertices, chunk_size) if len(vertices) > 0 else (
+        np.zeros(dimension), np.zeros(dimension))
+    extended = high > low
+    cells_per_axis = max(1, int(np.ceil(
+        (triangle_count * CELL_FRACTION / chunk_size) **
+        (1.0 / max(1, extended.sum())))))
+    shape = tuple(np.where(extended, cells_per_axis, 1).tolist())
+    cell_size = np.where(extended, (high - low) / cells_per_axis, 1.0)
+
+    directory = tempfile.mkdtemp(dir=temp_dir, prefix="strip_stream_")
+    strip_count = 0
+    written = 0
+    try:
+        buckets = _Buckets(directory, chunk_size)
+        for start in range(0, triangle_count, chunk_size):
+            faces = np.asarray(indices[start:start + chunk_size],
+                               dtype=np.uint32)
+            centers = vertices[faces.ravel()].reshape(-1, 3, dimension).mean(
+                axis=1)
+            coordinates = np.clip(((centers - low) / cell_size).astype(
+                np.int64), 0, np.array(shape) - 1)
+            # neighbouring cells of the row major order share a border
+            cells = np.ravel_multi_index(coordinates.T, shape)
+            buckets.add(cells, faces)
+        buckets.flush()
+
+        def write(chunk):
+            nonlocal strip_count, written
+            for strip in _stripify_chunk(chunk, method, params):
+                if strip_count > 0:
+                    output.write(np.uint32(RESTART_INDEX).tobytes())
+                    written += 1
+                strip.astype(np.uint32).tofile(output)
+                written += len(strip)
+                strip_count += 1
+
+        with open(output_path, "wb") as output:
+            # consecutive cells are stripified together up to chunk_size
+            # triangles, a cell larger than a chunk is split
+            pending = []
+            pending_count = 0
+            for cell in sorted(buckets.cells):
+                cell_faces = np.fromfile(buckets.path(cell), dtype=np.uint32)
+                os.remove(buckets.path(cell))
+                cell_faces = cell_faces.reshape(-1, 3)
+                if pending_count + len(cell_faces) > chunk_size and pending:
+                    write(np.concatenate(pending))
+                    pending = []
+                    pending_count = 0
+                for start in range(0, len(cell_faces), chunk_size):
+                    part = cell_faces[start:start + chunk_size]
+                    if len(part) == chunk_size:
+                        write(part)
+                    else:
+                        pending.append(part)
+                        pending_count += len(part)
+            if pending:
+                write(np.concatenate(pending))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        'triangles': triangle_count,
+        'strips': strip_count,
+        'indices': written,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stripify a mesh stored as raw binary files.")
+    parser.add_argument("indices", help="uint32 (n, 3) index file")
+    parser.add_argument("vertices", help="float32 (m, d) vertex file")
+    parser.add_argument("output", help="uint32 strip file")
+    parser.add_argument("--dimension", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=1 << 18)
+    parser.add_argument("--method", default="greedy")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = stream_stripify(args.indices, args.vertices, args.output,
+                             args.dimension, args.chunk_size, args.method)
+    elapsed = time.perf_counter() - start
+    print(f"{counts['triangles']} triangles in {counts['strips']} strips "
+          f"with {counts['indices']} indices "
+          f"({counts['indices'] / max(counts['triangles'], 1):.2f} per "
+          f"triangle), {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
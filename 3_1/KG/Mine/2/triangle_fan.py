@@ -0,0 +1,236 @@
+""" Decomposition of a set of triangles into triangle fans and strips.
+
+    Triangles around a vertex with many triangles (e.g. the centre of an
+    n-gon) are badly covered by strips: consecutive fan triangles only share
+    an edge with the centre, so a strip through them ends after two
+    triangles. A fan covers them with one vertex per triangle.
+
+    find_fans_and_strips detects such high valence vertices, emits fans
+    around them and covers the remaining triangles with greedy strips. This
+    is repeated for a few minimum fan sizes and the mix with the fewest
+    emitted vertices is returned, the run time stays O(n log n).
+"""
+
+import numpy as np
+
+from triangle_strip import MeshAdjacency, as_adjacency, find_strip_greedy, \
+    join_strips
+
+# the minimum fan sizes tried by default besides strips only, None is
+# accepted for strips only as well
+FAN_SIZES = (16, 8, 6, 4, 3)
+
+
+def _vertex_faces(indices, vertex_count):
+    # the triangles of every vertex as offsets into an array of triangles
+    order = np.argsort(indices.ravel(), kind="stable")
+    offsets = np.searchsorted(indices.ravel()[order], np.arange(vertex_count + 1))
+    return (order // 3).tolist(), offsets.tolist()
+
+
+def _fans_around(center, faces, candidates):
+    # maximal fans around the centre over the given triangles. Every triangle
+    # is rotated to (center, a, b), a fan continues from b with the triangle
+    # starting at b, so all triangles keep their winding.
+    following = dict()
+    targets = set()
+    for face in candidates:
+        a, b, c = faces[face]
+        if a == center:
+            start, end = b, c
+        elif b == center:
+            start, end = c, a
+        else:
+            start, end = a, b
+        following.setdefault(start, []).append((end, face))
+        targets.add(end)
+
+    # fans start at vertices nothing leads to, whatever is left over are
+    # closed rings around the centre
+    starts = [v for v in following if v not in targets] + list(following)
+    fans = []
+    for start in starts:
+        if not following.get(start):
+            continue
+        fan = [center, start]
+        fan_faces = []
+        current = start
+        while following.get(current):
+            current, face = following[current].pop()
+            fan.append(current)
+            fan_faces.append(face)
+        fans.append((fan, fan_faces))
+    return fans
+
+
+def primitive_cost(fans, strips):
+    """ Returns the emitted vertices of fans and strips drawn with primitive
+        restart, one draw call for the fans and one for the strips.
+    """
+    cost = 0
+    for primitives in (fans, strips):
+        if len(primitives) > 0:
+            cost += sum(map(len, primitives)) + len(primitives) - 1
+    return cost
+
+
+def find_fans(adjacency, min_fan_size):
+    """ Finds fans of at least min_fan_size triangles around the vertices
+        with the most triangles and marks their triangles as used.
+
+    Args:
+        adjacency (MeshAdjacency): The mesh, unused triangles are covered.
+        min_fan_size (int): The minimum amount of triangles of a fan.
+
+    Returns:
+        List of lists: The fans over vertex indices, the centre first.
+    """
+    faces = adjacency.indices.tolist()
+    vertex_faces, offsets = _vertex_faces(adjacency.indices,
+                                          adjacency.vertex_count)
+    counts = np.diff(offsets)
+    centers = np.argsort(-counts, kind="stable")
+    centers = centers[counts[centers] >= min_fan_size].tolist()
+
+    fans = []
+    for center in centers:
+        candidates = [face for face in
+                      vertex_faces[offsets[center]:offsets[center + 1]]
+                      if adjacency.used[face] == 0]
+        if len(candidates) < min_fan_size:
+            continue
+        for fan, fan_faces in _fans_around(center, faces, candidates):
+            if len(fan_faces) < min_fan_size:
+                continue
+            for face in fan_faces:
+                adjacency.use(face)
+            fans.append(fan)
+    return fans
+
+
+def find_fans_and_strips(triangles, fan_sizes=FAN_SIZES, join=False):
+    """ Covers a set of triangles with triangle fans and triangle strips.
+
+        For every minimum fan size the fans are found first, the remaining
+        triangles are stripified with find_strip_greedy. The decomposition
+        with the lowest primitive_cost is returned.
+
+    Args:
+        triangles (list of triangles): A list of triangles, see
+            triangle_strip.find_strip.
+        fan_sizes (iterable): The minimum fan sizes to try, strips only are
+            always tried.
+        join (bool): If True, the strips are joined by degenerate triangles
+            into a single strip, like find_strip_greedy.
+
+    Returns:
+        Tuple: The fans as lists of elements (the centre first, like
+        GL_TRIANGLE_FAN) and the strips in the format of find_strip_greedy.
+    """
+    adjacency = as_adjacency(triangles)
+    # strips only is always a candidate, e.g. if no vertex has enough
+    # triangles for a fan of the given sizes
+    strips = find_strip_greedy(MeshAdjacency(adjacency.indices), join=False)
+    best = (primitive_cost([], strips), [], strips)
+    for fan_size in fan_sizes:
+        if fan_size is None:
+            continue
+        adjacency.reset()
+        fans = find_fans(adjacency, fan_size)
+        if len(fans) == 0:
+            # the same as strips only
+            continue
+        # the strips are searched on a mesh of the remaining triangles
+        remaining = [i for i in range(len(adjacency)) if adjacency.used[i] == 0]
+        strips = []
+        if len(remaining) > 0:
+            rest = MeshAdjacency(adjacency.indices[remaining])
+            strips = find_strip_greedy(rest, join=False)
+        cost = primitive_cost(fans, strips)
+        if cost < best[0]:
+            best = (cost, fans, strips)
+
+    cost, fans, strips = best
+    fans = [adjacency.to_elements(fan) for fan in fans]
+    strips = [adjacency.to_elements(strip) for strip in strips]
+    if join:
+        strips = join_strips(strips)
+    return fans, strips
+
+
+def fan_strip(fan):
+    """ Returns a triangle strip with the triangles of a fan.
+
+        Consecutive fan triangles only share the edge to the centre, so
+        every second triangle needs a degenerate triangle to keep the
+        winding: (c, v0, v1, v2, v3, v4) becomes (c, v0, v1, v1, c, v2, v3,
+        v3, c, v4), about two vertices per triangle.
+    """
+    center, ring = fan[0], fan[1:]
+    strip = [center, ring[0], ring[1]]
+    for i in range(2, len(ring)):
+        if i % 2 == 0:
+            strip += [ring[i - 1], center, ring[i]]
+        else:
+            strip.append(ring[i])
+    return strip
+
+
+def find_strip_fans(triangles, fan_sizes=FAN_SIZES, join=True):
+    """ find_fans_and_strips with the fans converted into strips, the
+        "fans" method of triangle_strip.stripify.
+
+        The result has the format of find_strip_greedy, so it can be compared
+        with the other methods. A fan needs about two strip vertices per
+        triangle, drawing the fans as GL_TRIANGLE_FAN needs
+        find_fans_and_strips.
+
+    Args:
+        triangles (list of triangles): A list of triangles, see
+            triangle_strip.find_strip.
+        fan_sizes (iterable): The minimum fan sizes to try, see
+            find_fans_and_strips.
+        join (bool): If True, a single strip is returned, otherwise a list
+            of strips.
+
+    Returns:
+        The strip or the strips in the format of find_strip_greedy.
+    """
+    fans, strips = find_fans_and_strips(triangles, fan_sizes, join=False)
+    strips = [fan_strip(fan) for fan in fans] + strips
+    if join:
+        return join_strips(strips)
+    return strips
+
+
+def example():
+    import math
+
+    from figures import FIGURE2_TRIANGLES
+    from geometry import grid_triangles
+
+    n = 64
+    ring = [(round(math.cos(2 * math.pi * i / n), 6),
+             round(math.sin(2 * math.pi * i / n), 6)) for i in range(n)]
+    n_gon = [((0.0, 0.0), ring[i], ring[(i + 1) % n]) for i in range(n)]
+    figure2 = [tuple(FIGURE2_TRIANGLES[i:i + 3])
+               for i in range(0, len(FIGURE2_TRIANGLES), 3)]
+    grid = grid_triangles(50, 50)
+
+    for name, triangles in (('figure 2', figure2), (f'{n}-gon', n_gon),
+                            ('50x50 grid', grid)):
+        fans, strips = find_fans_and_strips(triangles)
+        only_strips = find_strip_greedy(triangles, join=False)
+        print(f"{name}: {len(fans)} fans and {len(strips)} strips with "
+              f"{primitive_cost(fans, strips)} vertices, strips only "
+              f"{primitive_cost([], only_strips)} vertices")
+
+    # no grid vertex has 16 triangles, strips only are left
+    fans, strips = find_fans_and_strips(grid, fan_sizes=(16,))
+    print(f"50x50 grid, fans of at least 16 triangles: {len(fans)} fans "
+          f"and {len(strips)} strips with {primitive_cost(fans, strips)} "
+          f"vertices")
+
+
+if __name__ == "__main__":
+    example()
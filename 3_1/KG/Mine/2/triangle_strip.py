@@ -37,8 +37,203 @@
         For more information, please refer to <https://unlicense.org>
 """
 
+import concurrent.futures
+import heapq
+import multiprocessing
+import os
+import random
+import time
+from multiprocessing import shared_memory
 
-def find_strip(triangles):
+import numpy as np
+
+from mesh import build_indexed_mesh
+
+
+class MeshAdjacency:
+    """ Adjacency information of a triangle mesh.
+
+        The triangles are stored as an (n, 3) array of vertex indices. Every
+        undirected edge gets an id, the triangles sharing an edge and the
+        neighbours of every triangle are stored in compressed arrays (offsets
+        and values), so they can be queried in constant time.
+
+        Additionally the usage count of every triangle, the amount of unused
+        neighbours of every triangle (its valence) and the amount of unused
+        triangles are tracked for the traversal algorithms.
+
+    Args:
+        indices (array like): An (n, 3) array of vertex indices.
+        vertices (list): Optional list mapping the vertex indices back to the
+            original vertex elements.
+    """
+
+    def __init__(self, indices, vertices=None):
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+        self.indices = indices
+        self.vertices = vertices
+        triangle_count = len(indices)
+
+        # edge k of triangle i goes from corner k to corner k + 1, the edge
+        # key is built from the smaller and the larger vertex index
+        start = indices.ravel()
+        end = np.roll(indices, -1, axis=1).ravel()
+        low = np.minimum(start, end)
+        high = np.maximum(start, end)
+        vertex_count = int(indices.max()) + 1 if triangle_count > 0 else 0
+        keys = low * vertex_count + high
+        self.edge_keys, edge_ids = np.unique(keys, return_inverse=True)
+        edge_ids = edge_ids.ravel()
+        self.vertex_count = vertex_count
+        self.face_edges = edge_ids.reshape(-1, 3)
+
+        # triangles of every edge, ordered by edge and triangle index
+        edge_counts = np.bincount(edge_ids, minlength=len(self.edge_keys))
+        self.edge_offsets = np.zeros(len(self.edge_keys) + 1, dtype=np.int64)
+        np.cumsum(edge_counts, out=self.edge_offsets[1:])
+        self.edge_faces = np.argsort(edge_ids, kind="stable") // 3
+
+        # neighbours of every triangle: pair each corner edge with all
+        # triangles on that edge and drop the triangle itself
+        repeats = edge_counts[edge_ids]
+        source = np.repeat(np.arange(len(edge_ids)) // 3, repeats)
+        group_start = np.repeat(np.cumsum(repeats) - repeats, repeats)
+        position = (np.repeat(self.edge_offsets[edge_ids], repeats) +
+                    np.arange(len(source)) - group_start)
+        target = self.edge_faces[position]
+        keep = source != target
+        self.neighbours = target[keep]
+        self.neighbour_offsets = np.zeros(triangle_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source[keep], minlength=triangle_count),
+                  out=self.neighbour_offsets[1:])
+
+        # python lists of the static data for the traversal loops, indexing
+        # them is a lot faster than indexing numpy arrays element wise
+        self._faces = indices.tolist()
+        self._face_edges = self.face_edges.tolist()
+        self._edge_faces = self.edge_faces.tolist()
+        self._edge_offsets = self.edge_offsets.tolist()
+        self._neighbours = self.neighbours.tolist()
+        self._neighbour_offsets = self.neighbour_offsets.tolist()
+
+        self.reset()
+
+    @classmethod
+    def from_triangles(cls, triangles):
+        """ Builds the adjacency of triangles given as 3 hashable elements,
+            like the input of find_strip.
+        """
+        vertex_ids = dict()
+        vertices = []
+        indices = []
+        for triangle in triangles:
+            if len(triangle) != 3:
+                raise ValueError(
+                    f"A triangle needs 3 vertices, got {len(triangle)}")
+            face = []
+            for vertex in triangle:
+                if vertex not in vertex_ids:
+                    vertex_ids[vertex] = len(vertices)
+                    vertices.append(vertex)
+                face.append(vertex_ids[vertex])
+            indices.append(face)
+        return cls(np.array(indices, dtype=np.int64).reshape(-1, 3), vertices)
+
+    @classmethod
+    def from_flat_coordinates(cls, triangles, dimension=2, epsilon=1e-6):
+        """ Builds the adjacency of triangles given as flat coordinate lists,
+            e.g. [x0, y0, x1, y1, x2, y2]. Vertices closer than epsilon are
+            welded into one vertex, see mesh.build_indexed_mesh.
+        """
+        vertices, indices = build_indexed_mesh(
+            triangles, dimension, epsilon, dtype=np.float64)
+        return cls(indices, [tuple(vertex) for vertex in vertices.tolist()])
+
+    def __len__(self):
+        return len(self._faces)
+
+    def reset(self):
+        """ Marks all triangles as unused. """
+        self.used = [0] * len(self._faces)
+        self.valence = [self._neighbour_offsets[i + 1] -
+                        self._neighbour_offsets[i]
+                        for i in range(len(self._faces))]
+        self.remaining = len(self._faces)
+
+    def use(self, face):
+        """ Increases the usage count of a triangle. """
+        self.used[face] += 1
+        if self.used[face] == 1:
+            self.remaining -= 1
+            for neighbour in self.neighbours_of(face):
+                self.valence[neighbour] -= 1
+
+    def release(self, face):
+        """ Decreases the usage count of a triangle. """
+        self.used[face] -= 1
+        if self.used[face] == 0:
+            self.remaining += 1
+            for neighbour in self.neighbours_of(face):
+                self.valence[neighbour] += 1
+
+    def neighbours_of(self, face):
+        """ Returns the triangles sharing an edge with the given one. """
+        return self._neighbours[self._neighbour_offsets[face]:
+                                self._neighbour_offsets[face + 1]]
+
+    def faces_of_edge(self, edge):
+        """ Returns the triangles containing the edge with the given id. """
+        return self._edge_faces[self._edge_offsets[edge]:
+                                self._edge_offsets[edge + 1]]
+
+    def edge_of(self, face, a, b):
+        """ Returns the id of the edge (a, b) of the given triangle or None if
+            the triangle does not contain both vertices.
+        """
+        corners = self._faces[face]
+        for k in range(3):
+            start, end = corners[k], corners[(k + 1) % 3]
+            if (start == a and end == b) or (start == b and end == a):
+                return self._face_edges[face][k]
+        return None
+
+    def find_edge(self, a, b):
+        """ Returns the id of the edge (a, b) or None if it does not exist. """
+        if a > b:
+            a, b = b, a
+        key = a * self.vertex_count + b
+        edge = int(np.searchsorted(self.edge_keys, key))
+        if edge < len(self.edge_keys) and self.edge_keys[edge] == key:
+            return edge
+        return None
+
+    def third_vertex(self, face, a, b):
+        """ Returns the vertex of the triangle that is neither a nor b. """
+        for vertex in self._faces[face]:
+            if vertex != a and vertex != b:
+                return vertex
+        return None
+
+    def to_elements(self, strip):
+        """ Maps vertex indices back to the original vertex elements. """
+        if self.vertices is None:
+            return list(strip)
+        return [self.vertices[vertex] for vertex in strip]
+
+
+def as_adjacency(triangles):
+    """ Returns a MeshAdjacency of a MeshAdjacency (reset, so all triangles
+        are unused again), an (n, 3) index array or a list of triangles.
+    """
+    if isinstance(triangles, MeshAdjacency):
+        triangles.reset()
+        return triangles
+    if isinstance(triangles, np.ndarray):
+        return MeshAdjacency(triangles)
+    return MeshAdjacency.from_triangles(triangles)
+
+
+def find_strip(triangles, join=True):
     """ Finds a triangle strip representation for a given set of triangle
         faces.
 
@@ -46,24 +241,24 @@ def find_strip(triangles):
         triangles (list of triangles): A list of triangles. A triangle is
             represented by a list or tuple of 3 elements. The order of those
             elements does not matter. The elements should be comparable and
-            should be able to be an element of a set.
+            should be able to be an element of a set. An (n, 3) numpy array
+            of vertex indices or a MeshAdjacency can be passed as well.
+        join (bool): If False, the strip is returned in a list, like the
+            strips of the other methods.
 
     Returns:
         List of elements: A list consisting of the triangle elements that form
         a triangle strip covering all triangles at least once.
     """
 
-    def find_strip_internal(current_strip, used_triangles, max_triangle_usage):
+    adjacency = as_adjacency(triangles)
+    triangles = adjacency.indices.tolist()
 
-        # check if we covered all triangles by now
-        unused_triangles_existing = False
-        for i in range(len(triangles)):
-            if used_triangles[i] == 0:
-                unused_triangles_existing = True
-                break
+    def find_strip_internal(current_strip, used_triangles, max_triangle_usage,
+                            last_triangle=None):
 
         # if we covered all triangles, we found a solution and return it
-        if not unused_triangles_existing:
+        if adjacency.remaining == 0:
             return current_strip
 
         if len(current_strip) == 0:
@@ -71,7 +266,7 @@ def find_strip(triangles):
             # the starting point for the recursive algorithm.
             for i, triangle in enumerate(triangles):
                 # mark the triangle as used triangle (used once)
-                used_triangles[i] = 1
+                adjacency.use(i)
 
                 # Each permutation of the first triangles vertices have to
                 # be tested, since their order matters.
@@ -80,7 +275,7 @@ def find_strip(triangles):
                 # strip and recursively find adjacent triangles
                 current_strip += [triangle[0], triangle[1], triangle[2]]
                 result = find_strip_internal(
-                    current_strip, used_triangles, max_triangle_usage)
+                    current_strip, used_triangles, max_triangle_usage, i)
 
                 # if the result of that search is not none, we found a solution
                 # hence return the solution
@@ -92,35 +287,35 @@ def find_strip(triangles):
                 # and repeat the same for all other permutations
                 current_strip += [triangle[0], triangle[2], triangle[1]]
                 result = find_strip_internal(
-                    current_strip, used_triangles, max_triangle_usage)
+                    current_strip, used_triangles, max_triangle_usage, i)
                 if result is not None:
                     return result
                 current_strip = current_strip[:-3]
 
                 current_strip += [triangle[1], triangle[0], triangle[2]]
                 result = find_strip_internal(
-                    current_strip, used_triangles, max_triangle_usage)
+                    current_strip, used_triangles, max_triangle_usage, i)
                 if result is not None:
                     return result
                 current_strip = current_strip[:-3]
 
                 current_strip += [triangle[1], triangle[2], triangle[0]]
                 result = find_strip_internal(
-                    current_strip, used_triangles, max_triangle_usage)
+                    current_strip, used_triangles, max_triangle_usage, i)
                 if result is not None:
                     return result
                 current_strip = current_strip[:-3]
 
                 current_strip += [triangle[2], triangle[0], triangle[1]]
                 result = find_strip_internal(
-                    current_strip, used_triangles, max_triangle_usage)
+                    current_strip, used_triangles, max_triangle_usage, i)
                 if result is not None:
                     return result
                 current_strip = current_strip[:-3]
 
                 current_strip += [triangle[2], triangle[1], triangle[0]]
                 result = find_strip_internal(
-                    current_strip, used_triangles, max_triangle_usage)
+                    current_strip, used_triangles, max_triangle_usage, i)
                 if result is not None:
                     return result
                 current_strip = current_strip[:-3]
@@ -128,13 +323,16 @@ def find_strip(triangles):
                 # if we checked all permutations of the current triangle and
                 # none was successfull, reset the usage of the triangle and
                 # try the next one
-                used_triangles[i] = 0
+                adjacency.release(i)
         else:
             # non initial state
             # checking each triangle if it can be used to extend the current
             # triangle strip. Therefore the triangles strip last two vertices
-            # have to be part of the triangle
-            for i, triangle in enumerate(triangles):
+            # have to be part of the triangle, these are exactly the
+            # triangles on the last edge of the last added triangle
+            part_of_triangle = (current_strip[-2], current_strip[-1])
+            edge = adjacency.edge_of(last_triangle, *part_of_triangle)
+            for i in adjacency.faces_of_edge(edge):
 
                 # check if the triangle is already covered the maximum allowed
                 # amount, if this is true, we cannot use it again for the
@@ -142,27 +340,17 @@ def find_strip(triangles):
                 if used_triangles[i] >= max_triangle_usage:
                     continue
 
-                # check if the last two vertices of the current strip are part
-                # of the current triangle
-                triangle_as_set = set(triangle)
-                part_of_triangle = {current_strip[-1], current_strip[-2]}
-                if not triangle_as_set.issuperset(part_of_triangle):
-                    # triangle does not share two of the same vertices, hence
-                    # we cannot use it
-                    continue
-
                 # get the vertex that was not part of the triangle strip
-                triangle_vertex = list(
-                    triangle_as_set.difference(part_of_triangle))[0]
+                triangle_vertex = adjacency.third_vertex(i, *part_of_triangle)
 
                 # increase the usage of the current triangle and append its
                 # vertex to the current strip
-                used_triangles[i] += 1
+                adjacency.use(i)
                 current_strip.append(triangle_vertex)
 
                 # now check recursively for a solution
                 result = find_strip_internal(
-                    current_strip, used_triangles, max_triangle_usage)
+                    current_strip, used_triangles, max_triangle_usage, i)
                 # if a solution was found, we return it
                 if result is not None:
                     return result
@@ -170,7 +358,7 @@ def find_strip(triangles):
                 # otherwise remove the current triangle from the strip and
                 # reduce its usage counter and continue with the next one.
                 current_strip.pop()
-                used_triangles[i] -= 1
+                adjacency.release(i)
 
         # if we reached here, we did not find a solution an thus return None
         return None
@@ -183,25 +371,522 @@ def find_strip(triangles):
 
     # we repeat the search until we found a solution
     while result is None:
-        # initialize the used / covered triangle count and set it to zero for
-        # every triangle
-        tmp_used_triangles = dict()
-        for i in range(len(triangles)):
-            tmp_used_triangles[i] = 0
+        # reset the used / covered triangle count of every triangle
+        adjacency.reset()
 
         # we start out with an empty triangle strip
         tmp_triangle_strip = []
         # call our function to find a triangle strip for the given constraints
         result = find_strip_internal(
-            tmp_triangle_strip, tmp_used_triangles, usage)
+            tmp_triangle_strip, adjacency.used, usage)
 
         # increase the allowed usage for the next check
         usage += 1
 
     # return the found solution
+    strip = adjacency.to_elements(result)
+    return strip if join else [strip]
+
+
+def join_strips(strips):
+    """ Joins several triangle strips into a single one by inserting
+        degenerate triangles between them.
+
+        Every strip is started at an even position of the joined strip, so
+        the winding of its triangles is kept.
+
+    Args:
+        strips (list of lists): The triangle strips to join.
+
+    Returns:
+        List of elements: A single triangle strip containing all triangles of
+        the given strips.
+    """
+    result = []
+    for strip in strips:
+        if len(strip) == 0:
+            continue
+        if len(result) > 0:
+            # repeat the last element of the previous strip and the first
+            # element of the next one, this creates zero area triangles
+            result.append(result[-1])
+            result.append(strip[0])
+            if len(result) % 2 == 1:
+                result.append(strip[0])
+        result.extend(strip)
     return result
 
 
+def find_strip_greedy(triangles, join=True):
+    """ Finds a triangle strip representation for a given set of triangle
+        faces using a greedy lowest valence first heuristic (similar to the
+        one used by SGI's tomesh and STRIPE).
+
+        The adjacency of the triangles is computed once. Strips are started at
+        the unused triangle with the fewest unused neighbours and are grown
+        in both directions, always continuing with the neighbour that has the
+        fewest unused neighbours itself. This runs in O(n log n), but the
+        result is usually longer than the one of find_strip.
+
+    Args:
+        triangles (list of triangles): A list of triangles, see find_strip.
+        join (bool): If True, the found strips are joined by degenerate
+            triangles into a single strip, otherwise the list of strips is
+            returned.
+
+    Returns:
+        List of elements or list of lists: A triangle strip (or several
+        triangle strips) covering every triangle exactly once.
+    """
+    adjacency = as_adjacency(triangles)
+    faces = adjacency.indices.tolist()
+    valence = adjacency.valence
+
+    # the heap contains (valence, triangle) pairs. Entries get outdated when
+    # the valence of a triangle drops, those are skipped when popped.
+    heap = [(valence[i], i) for i in range(len(faces))]
+    heapq.heapify(heap)
+
+    def mark_used(i):
+        adjacency.use(i)
+        for j in adjacency.neighbours_of(i):
+            if adjacency.used[j] == 0:
+                heapq.heappush(heap, (valence[j], j))
+
+    def next_triangle(last, a, b):
+        # the unused triangle with the lowest valence sharing the edge (a, b)
+        # of the last added triangle
+        best = None
+        for j in adjacency.faces_of_edge(adjacency.edge_of(last, a, b)):
+            if adjacency.used[j] == 0 and (best is None or
+                                           valence[j] < valence[best]):
+                best = j
+        return best
+
+    def grow(strip, last):
+        while True:
+            a, b = strip[-2], strip[-1]
+            i = next_triangle(last, a, b)
+            if i is None:
+                return
+            mark_used(i)
+            strip.append(adjacency.third_vertex(i, a, b))
+            last = i
+
+    strips = []
+    while adjacency.remaining > 0:
+        current_valence, i = heapq.heappop(heap)
+        if adjacency.used[i] > 0 or current_valence != valence[i]:
+            continue
+        mark_used(i)
+
+        # rotate the starting triangle so its last edge leads to the
+        # neighbour with the lowest valence
+        a, b, c = faces[i]
+        strip = [a, b, c]
+        best_valence = None
+        for rotation in ((a, b, c), (b, c, a), (c, a, b)):
+            j = next_triangle(i, rotation[1], rotation[2])
+            if j is not None and (best_valence is None or
+                                  valence[j] < best_valence):
+                strip = list(rotation)
+                best_valence = valence[j]
+
+        # grow the strip forwards and then backwards, in both directions the
+        # strip ends with an edge of the starting triangle
+        grow(strip, i)
+        strip.reverse()
+        grow(strip, i)
+        strips.append(adjacency.to_elements(strip))
+
+    if join:
+        return join_strips(strips)
+    return strips
+
+
+# the order in which the vertex permutations of a starting triangle are tried
+PERMUTATIONS = ((0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1),
+                (2, 1, 0))
+
+
+class SearchBudget:
+    """ Limits the amount of nodes and the time of the exact strip search.
+
+    Args:
+        max_nodes (int): The maximum amount of visited search nodes or None.
+        time_limit (float): The maximum search time in seconds or None.
+    """
+
+    # the clock is only read every few nodes
+    CLOCK_INTERVAL = 1024
+
+    def __init__(self, max_nodes=None, time_limit=None):
+        self.max_nodes = max_nodes
+        self.deadline = None
+        if time_limit is not None:
+            self.deadline = time.perf_counter() + time_limit
+        self.nodes = 0
+        self.exhausted = False
+
+    def step(self):
+        """ Counts a visited node, returns True if the budget is used up. """
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            self.exhausted = True
+        elif (self.deadline is not None and
+              self.nodes % self.CLOCK_INTERVAL == 0 and
+              time.perf_counter() > self.deadline):
+            self.exhausted = True
+        return self.exhausted
+
+
+class _PartialStrip:
+    # the strip covering the most triangles seen during a search and the
+    # triangles it covers
+    def __init__(self):
+        self.covered = 0
+        self.strip = []
+        self.faces = []
+
+
+def _exact_strip_search(adjacency, max_triangle_usage, roots, budget, best):
+    """ The search of find_strip with an explicit stack instead of recursion.
+
+        The candidates are tried in the same order as in find_strip, so the
+        same strip is found. Returns the strip or None if there is no
+        solution starting at one of the roots or the budget is used up. The
+        best partial strip is tracked in best unless it is None.
+    """
+    faces = adjacency.indices.tolist()
+    used = adjacency.used
+    triangle_count = len(faces)
+    strip = []
+    # the triangles added to the strip, one per stack frame
+    path = []
+    # every frame contains the candidates of a search node, the position of
+    # the next candidate and the amount of vertices the current candidate
+    # added to the strip (0 if no candidate is applied)
+    stack = []
+
+    def enter():
+        # visits the node of the current strip, returns True if the strip
+        # covers all triangles
+        if adjacency.remaining == 0:
+            return True
+        if len(strip) == 0:
+            candidates = [(i, permutation) for i in roots
+                          for permutation in PERMUTATIONS]
+        else:
+            edge = adjacency.edge_of(path[-1], strip[-2], strip[-1])
+            candidates = adjacency.faces_of_edge(edge)
+        stack.append([candidates, 0, 0])
+        return False
+
+    if enter():
+        return strip
+
+    while len(stack) > 0:
+        frame = stack[-1]
+        candidates, position, pushed = frame
+
+        # undo the candidate applied last in this node
+        if pushed > 0:
+            del strip[-pushed:]
+            adjacency.release(path.pop())
+            frame[2] = 0
+
+        if budget is not None and budget.step():
+            return None
+
+        # skip the candidates which are used the maximum allowed amount
+        if len(strip) > 0:
+            while (position < len(candidates) and
+                   used[candidates[position]] >= max_triangle_usage):
+                position += 1
+        if position == len(candidates):
+            stack.pop()
+            continue
+        frame[1] = position + 1
+
+        # apply the candidate
+        if len(strip) == 0:
+            i, permutation = candidates[position]
+            strip += [faces[i][k] for k in permutation]
+            frame[2] = 3
+        else:
+            i = candidates[position]
+            strip.append(adjacency.third_vertex(i, strip[-2], strip[-1]))
+            frame[2] = 1
+        adjacency.use(i)
+        path.append(i)
+
+        covered = triangle_count - adjacency.remaining
+        if best is not None and covered > best.covered:
+            best.covered = covered
+            best.strip = list(strip)
+            best.faces = list(path)
+
+        if enter():
+            return strip
+
+    return None
+
+
+def _complete_partial_strip(adjacency, best):
+    # covers the triangles missed by the best partial strip greedily
+    covered = np.zeros(len(adjacency), dtype=bool)
+    covered[best.faces] = True
+    strips = [best.strip] if len(best.strip) > 0 else []
+    if not covered.all():
+        rest = MeshAdjacency(adjacency.indices[~covered])
+        strips += find_strip_greedy(rest, join=False)
+    return strips
+
+
+def find_strip_iterative(triangles, max_nodes=None, time_limit=None,
+                         join=True, budget=None):
+    """ Finds a triangle strip representation like find_strip, but without
+        recursion and with an optional limit of the search.
+
+        The same strip as with find_strip is found if the search finishes.
+        If the budget is used up, the strip covering the most triangles found
+        so far is returned, together with greedy strips of the remaining
+        triangles.
+
+    Args:
+        triangles (list of triangles): A list of triangles, see find_strip.
+        max_nodes (int): The maximum amount of search nodes or None.
+        time_limit (float): The maximum search time in seconds or None.
+        join (bool): If True, a single strip is returned (joined with
+            degenerate triangles if the search was stopped), otherwise a list
+            of strips.
+        budget (SearchBudget): A budget to use instead of max_nodes and
+            time_limit, after the search it tells whether it was used up.
+
+    Returns:
+        List of elements or list of lists: The triangle strip or strips.
+    """
+    adjacency = as_adjacency(triangles)
+    if budget is None:
+        budget = SearchBudget(max_nodes, time_limit)
+    roots = range(len(adjacency))
+    best = _PartialStrip()
+
+    # same as in find_strip, the allowed triangle usage is increased until a
+    # solution is found
+    usage = 1
+    result = None
+    while result is None and not budget.exhausted:
+        adjacency.reset()
+        result = _exact_strip_search(adjacency, usage, roots, budget, best)
+        usage += 1
+
+    if result is not None:
+        strips = [result]
+    else:
+        strips = _complete_partial_strip(adjacency, best)
+    strips = [adjacency.to_elements(strip) for strip in strips]
+
+    if join:
+        return join_strips(strips)
+    return strips
+
+
+class _CancelledBudget(SearchBudget):
+    # stops the search of a parallel task once another task found a solution
+    # that comes first in the serial search order
+    def __init__(self, best_key, key):
+        super().__init__()
+        self.best_key = best_key
+        self.key = key
+
+    def step(self):
+        self.nodes += 1
+        if (self.nodes % self.CLOCK_INTERVAL == 0 and
+                self.best_key.value < self.key):
+            self.exhausted = True
+        return self.exhausted
+
+
+# the mesh of a worker process of find_strip_parallel
+_worker = dict()
+
+
+def _init_strip_worker(memory_name, triangle_count, best_key):
+    memory = shared_memory.SharedMemory(name=memory_name)
+    indices = np.ndarray((triangle_count, 3), dtype=np.int64,
+                         buffer=memory.buf)
+    _worker["memory"] = memory
+    _worker["adjacency"] = MeshAdjacency(indices)
+    _worker["best_key"] = best_key
+
+
+def _search_roots(adjacency, usage, roots, first_position, best_key):
+    # runs the exact search for every root on its own, in order, and returns
+    # the position of the first root with a solution and that solution
+    for position, root in enumerate(roots, first_position):
+        key = (usage - 1) * len(adjacency) + position
+        if best_key is not None and best_key.value < key:
+            return None
+        budget = None
+        if best_key is not None:
+            budget = _CancelledBudget(best_key, key)
+        adjacency.reset()
+        result = _exact_strip_search(adjacency, usage, [root], budget, None)
+        if result is not None:
+            return key, list(result)
+    return None
+
+
+def _strip_worker_task(usage, roots, first_position):
+    return _search_roots(_worker["adjacency"], usage, roots, first_position,
+                         _worker["best_key"])
+
+
+def find_strip_parallel(triangles, workers=None, seed=None, join=True,
+                        block_size=None):
+    """ Finds a triangle strip representation like find_strip, with the
+        starting triangles and allowed usages searched in parallel.
+
+        The search of find_strip is split into tasks of (usage, starting
+        triangles) which are run in a process pool. The triangle indices are
+        shared with the workers through shared memory. Once a task finds a
+        solution, the tasks coming later in the serial search order are
+        cancelled, so the result is the same as with find_strip (or with a
+        single worker and the same seed).
+
+    Args:
+        triangles (list of triangles): A list of triangles, see find_strip.
+        workers (int): The amount of worker processes, defaults to the amount
+            of CPUs. With one worker the search runs in this process.
+        seed (int): If given, the starting triangles are tried in a random
+            order seeded with it, otherwise in the order of the triangles.
+        join (bool): If True the strip is returned as a single strip,
+            otherwise as a list containing the strip.
+        block_size (int): The amount of starting triangles of a task.
+
+    Returns:
+        List of elements or list of lists: The triangle strip.
+    """
+    adjacency = as_adjacency(triangles)
+    triangle_count = len(adjacency)
+    roots = list(range(triangle_count))
+    if seed is not None:
+        random.Random(seed).shuffle(roots)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if triangle_count == 0:
+        result = []
+    elif workers == 1:
+        result = None
+        usage = 1
+        while result is None:
+            result = _search_roots(adjacency, usage, roots, 0, None)
+            usage += 1
+        result = result[1]
+    else:
+        result = _find_strip_pool(adjacency, roots, workers, block_size)
+
+    strip = adjacency.to_elements(result)
+    if join:
+        return strip
+    return [strip]
+
+
+def _find_strip_pool(adjacency, roots, workers, block_size):
+    triangle_count = len(adjacency)
+    if block_size is None:
+        block_size = max(1, triangle_count // (4 * workers))
+
+    def tasks():
+        # all (usage, roots) tasks in the order of the serial search
+        usage = 1
+        while True:
+            for first in range(0, triangle_count, block_size):
+                yield (usage - 1) * triangle_count + first, usage, first
+            usage += 1
+
+    indices = np.ascontiguousarray(adjacency.indices, dtype=np.int64)
+    memory = shared_memory.SharedMemory(create=True, size=indices.nbytes)
+    best_key = multiprocessing.Value("q", 2 ** 62, lock=False)
+    best = None
+    try:
+        np.ndarray(indices.shape, dtype=np.int64, buffer=memory.buf)[:] = \
+            indices
+        with concurrent.futures.ProcessPoolExecutor(
+                workers, initializer=_init_strip_worker,
+                initargs=(memory.name, triangle_count, best_key)) as pool:
+            pending = dict()
+            task_iterator = tasks()
+            next_task = next(task_iterator)
+            while True:
+                # keep the pool busy with the next tasks that can still beat
+                # the best solution found so far
+                while (len(pending) < 2 * workers and
+                       next_task[0] < best_key.value):
+                    key, usage, first = next_task
+                    future = pool.submit(_strip_worker_task, usage,
+                                         roots[first:first + block_size],
+                                         first)
+                    pending[future] = key
+                    next_task = next(task_iterator)
+                if len(pending) == 0:
+                    break
+
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    del pending[future]
+                    result = future.result()
+                    if result is not None and result[0] < best_key.value:
+                        best_key.value = result[0]
+                        best = result[1]
+
+                # cancel the tasks which cannot be first anymore
+                for future, key in list(pending.items()):
+                    if key > best_key.value and future.cancel():
+                        del pending[future]
+    finally:
+        memory.close()
+        memory.unlink()
+    return best
+
+
+def _find_strip_fans(triangles, **kwargs):
+    # triangle_fan builds on this module, so it is imported on first use
+    from triangle_fan import find_strip_fans
+
+    return find_strip_fans(triangles, **kwargs)
+
+
+# available stripification algorithms, "exact" is only feasible for a few
+# dozen triangles
+STRIP_METHODS = {
+    "exact": find_strip,
+    "greedy": find_strip_greedy,
+    "iterative": find_strip_iterative,
+    "parallel": find_strip_parallel,
+    "fans": _find_strip_fans,
+}
+
+
+def stripify(triangles, method="greedy", **kwargs):
+    """ Finds a triangle strip representation using the given algorithm.
+
+    Args:
+        triangles (list of triangles): A list of triangles, see find_strip.
+        method (str): The name of the algorithm, a key of STRIP_METHODS.
+        **kwargs: Additional arguments passed to the algorithm.
+
+    Returns:
+        The result of the chosen algorithm.
+    """
+    if method not in STRIP_METHODS:
+        raise ValueError(f"Unknown stripification method: {method}")
+    return STRIP_METHODS[method](triangles, **kwargs)
+
+
 def example():
     icosahedron_triangles = [[-1.5, -1.5, -1.0, -0.5, -0.5, -1.6],
                              [-0.71, -1.15, -0.5, -1.6, 0.5, -1.7],
@@ -215,8 +900,16 @@ def example():
                              [-1.5, 0.9, 1.2, 0.42, 1.25, 0.6],
                              ]
 
+    # the flat lists contain (x, y) pairs of the three vertices
+    icosahedron = MeshAdjacency.from_flat_coordinates(icosahedron_triangles)
+
+    print("Greedy triangle strip of an icosahedron")
+    triangle_strip = find_strip_greedy(icosahedron)
+    print("Triangle strip:", triangle_strip)
+    print("Length of the triangle strip:", len(triangle_strip))
+
     print("Trying to find a triangle strip representation of an icosahedron")
-    triangle_strip = find_strip(icosahedron_triangles)
+    triangle_strip = find_strip_iterative(icosahedron, time_limit=5.0)
     print("Triangle strip:", triangle_strip)
     print("Length of the triangle strip:", len(triangle_strip))
 
@@ -0,0 +1,341 @@
+""" Reordering of indexed triangle lists for the post-transform vertex cache.
+
+    The GPU keeps the last transformed vertices in a small cache, a vertex
+    which is still cached when a later triangle uses it again is not
+    transformed a second time. The quality of an order is measured by
+
+    ACMR: average cache miss ratio, transformed vertices per triangle (0.5 is
+          the optimum for large regular meshes, 3 the worst case).
+    ATVR: average transform to vertex ratio, transformed vertices per unique
+          vertex (1 is the optimum).
+
+    optimize_vertex_cache implements the linear time algorithm of Tom Forsyth
+    ("Linear-Speed Vertex Cache Optimisation", 2006). optimize_overdraw
+    then sorts clusters of the optimized order front to back (Sander, Nehab
+    and Barczak, "Fast Triangle Reordering for Vertex Locality and Reduced
+    Overdraw", 2007) and optimize_vertex_fetch renumbers the vertices in the
+    order they are used, so the vertex fetches read memory sequentially.
+"""
+
+import collections
+
+import numpy as np
+
+from triangle_strip import find_strip_greedy
+
+# the scoring constants of Forsyth's article
+CACHE_DECAY_POWER = 1.5
+LAST_TRIANGLE_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+
+def _as_indices(indices):
+    return np.ascontiguousarray(indices, dtype=np.int64).reshape(-1, 3)
+
+
+def cache_misses(elements, cache_size=32, restart_index=None):
+    """ Simulates a FIFO vertex cache, like the one of most GPUs.
+
+    Args:
+        elements (array like): The indices in drawing order, e.g. a flat
+            triangle list or a triangle strip.
+        cache_size (int): The amount of cached vertices.
+        restart_index (int): An index which is skipped, e.g. the primitive
+            restart index of a strip.
+
+    Returns:
+        int: The amount of vertices which had to be transformed.
+    """
+    cache = collections.deque()
+    cached = set()
+    misses = 0
+    for element in np.asarray(elements).ravel().tolist():
+        if element == restart_index or element in cached:
+            continue
+        misses += 1
+        cache.append(element)
+        cached.add(element)
+        if len(cache) > cache_size:
+            cached.discard(cache.popleft())
+    return misses
+
+
+def cache_statistics(indices, cache_size=32):
+    """ Returns the ACMR and ATVR of an indexed triangle list.
+
+    Args:
+        indices (array like): The (n, 3) vertex indices of the triangles.
+        cache_size (int): The amount of cached vertices.
+
+    Returns:
+        dict: acmr, atvr and the amount of misses.
+    """
+    indices = _as_indices(indices)
+    misses = cache_misses(indices, cache_size)
+    unique = len(np.unique(indices))
+    return {
+        'misses': misses,
+        'acmr': misses / len(indices) if len(indices) else 0.0,
+        'atvr': misses / unique if unique else 0.0,
+    }
+
+
+def _vertex_score(position, remaining, cache_size):
+    # the score of a vertex at the given cache position (-1 if it is not
+    # cached) with remaining unemitted triangles
+    if remaining == 0:
+        return -1.0
+    score = 0.0
+    if position >= 0:
+        if position < 3:
+            # the vertices of the last triangle get a fixed score, so the
+            # next triangle does not simply reuse its newest edge
+            score = LAST_TRIANGLE_SCORE
+        else:
+            scale = 1.0 / (cache_size - 3)
+            score = (1.0 - (position - 3) * scale) ** CACHE_DECAY_POWER
+    # vertices with few remaining triangles are finished first, so they do
+    # not have to be transformed again later
+    return score + VALENCE_BOOST_SCALE * remaining ** -VALENCE_BOOST_POWER
+
+
+def optimize_vertex_cache(indices, cache_size=32, return_clusters=False):
+    """ Reorders triangles for the post-transform vertex cache with Forsyth's
+        algorithm.
+
+        The next triangle is always the best scored triangle using a cached
+        vertex. Only the triangles of cached vertices are rescored after a
+        triangle is emitted, so the run time is linear in the triangle
+        count. If no cached vertex has triangles left, the algorithm
+        continues with the next unemitted triangle of the input order.
+
+    Args:
+        indices (array like): The (n, 3) vertex indices of the triangles.
+        cache_size (int): The size of the simulated LRU cache, a bit larger
+            than the FIFO cache of the GPU works well.
+        return_clusters (bool): If True, the positions in the new order where
+            the algorithm had to start over are returned as well.
+
+    Returns:
+        numpy.ndarray: The reordered (n, 3) indices, with the dtype of the
+        input. If return_clusters is True, a tuple of the indices and the
+        list of cluster starts.
+    """
+    source = np.asarray(indices)
+    indices = _as_indices(indices)
+    triangle_count = len(indices)
+    vertex_count = int(indices.max()) + 1 if triangle_count else 0
+    faces = indices.tolist()
+
+    # the triangles of every vertex, emitted ones are removed
+    order = np.argsort(indices.ravel(), kind="stable")
+    offsets = np.searchsorted(indices.ravel()[order], np.arange(vertex_count + 1))
+    triangle_of = (order // 3).tolist()
+    vertex_triangles = [triangle_of[offsets[v]:offsets[v + 1]]
+                        for v in range(vertex_count)]
+
+    remaining = [len(triangles) for triangles in vertex_triangles]
+    scores = [_vertex_score(-1, count, cache_size) for count in remaining]
+    emitted = [False] * triangle_count
+
+    cache = []
+    result = []
+    clusters = []
+    next_unemitted = 0
+    best = -1
+    while len(result) < triangle_count:
+        if best < 0:
+            # dead end, continue with the first unemitted triangle
+            while emitted[next_unemitted]:
+                next_unemitted += 1
+            best = next_unemitted
+            clusters.append(len(result))
+
+        emitted[best] = True
+        result.append(best)
+        triangle = faces[best]
+        for v in triangle:
+            remaining[v] -= 1
+            vertex_triangles[v].remove(best)
+
+        # move the vertices of the triangle to the front of the LRU cache,
+        # vertices pushed out at the end are rescored as uncached
+        cache = triangle + [v for v in cache if v not in triangle]
+        evicted = cache[cache_size:]
+        cache = cache[:cache_size]
+        for position, v in enumerate(cache):
+            scores[v] = _vertex_score(position, remaining[v], cache_size)
+        for v in evicted:
+            scores[v] = _vertex_score(-1, remaining[v], cache_size)
+
+        # the best triangle of a cached vertex is next, the triangles of
+        # evicted vertices are only candidates if they use a cached one
+        best = -1
+        best_score = -1.0
+        for v in cache:
+            for t in vertex_triangles[v]:
+                a, b, c = faces[t]
+                score = scores[a] + scores[b] + scores[c]
+                if score > best_score:
+                    best, best_score = t, score
+
+    reordered = source.reshape(-1, 3)[np.asarray(result, dtype=np.int64)]
+    if return_clusters:
+        return reordered, clusters
+    return reordered
+
+
+def _split_clusters(indices, starts, cache_size, threshold):
+    # splits the clusters further where the ACMR of the cluster so far is
+    # below threshold times the ACMR of the whole mesh (Sander et al.)
+    target = threshold * cache_statistics(indices, cache_size)['acmr']
+    boundaries = []
+    starts = list(starts) + [len(indices)]
+    for start, end in zip(starts[:-1], starts[1:]):
+        boundaries.append(start)
+        cache = collections.deque()
+        cached = set()
+        misses = 0
+        first = start
+        for t in range(start, end):
+            for v in indices[t].tolist():
+                if v not in cached:
+                    misses += 1
+                    cache.append(v)
+                    cached.add(v)
+                    if len(cache) > cache_size:
+                        cached.discard(cache.popleft())
+            if t + 1 < end and misses / (t + 1 - first) <= target:
+                # a soft boundary, the cache is flushed to keep the ACMR
+                boundaries.append(t + 1)
+                first = t + 1
+                misses = 0
+                cache.clear()
+                cached.clear()
+    return boundaries
+
+
+def optimize_overdraw(indices, vertices, cache_size=32, threshold=1.05):
+    """ Reorders the clusters of a cache optimized triangle list so that
+        triangles facing outwards are drawn first.
+
+        Triangles drawn later are then more often hidden by the depth test
+        and not shaded, from any direction. The order inside a cluster is
+        kept, so the ACMR gets worse by at most the threshold.
+
+    Args:
+        indices (array like): The (n, 3) indices, see optimize_vertex_cache.
+        vertices (array like): The (m, 2) or (m, 3) vertex positions.
+        cache_size (int): The size of the simulated cache.
+        threshold (float): The allowed increase of the ACMR, larger values
+            give more and smaller clusters.
+
+    Returns:
+        numpy.ndarray: The reordered (n, 3) indices.
+    """
+    optimized, starts = optimize_vertex_cache(indices, cache_size,
+                                              return_clusters=True)
+    as_int = _as_indices(optimized)
+    boundaries = _split_clusters(as_int, starts, cache_size, threshold)
+
+    positions = np.asarray(vertices, dtype=np.float64)
+    if positions.shape[1] == 2:
+        positions = np.hstack([positions, np.zeros((len(positions), 1))])
+    corners = positions[as_int]
+    normals = np.cross(corners[:, 1] - corners[:, 0],
+                       corners[:, 2] - corners[:, 0])
+    # the length of the cross product is twice the area, so the sums are area
+    # weighted
+    areas = np.linalg.norm(normals, axis=1)
+    centers = corners.mean(axis=1)
+    mesh_center = positions[np.unique(as_int)].mean(axis=0)
+
+    sizes = np.diff(boundaries + [len(as_int)])
+    cluster_of = np.repeat(np.arange(len(boundaries)), sizes)
+    cluster_normals = np.zeros((len(boundaries), 3))
+    np.add.at(cluster_normals, cluster_of, normals)
+    cluster_centers = np.zeros((len(boundaries), 3))
+    np.add.at(cluster_centers, cluster_of, centers * areas[:, None])
+    weights = np.bincount(cluster_of, weights=areas,
+                          minlength=len(boundaries))
+    cluster_centers /= np.maximum(weights, 1e-12)[:, None]
+
+    # clusters facing away from the center of the mesh are drawn first
+    facing = np.einsum("ij,ij->i", cluster_centers - mesh_center,
+                       cluster_normals)
+    cluster_order = np.argsort(-facing, kind="stable")
+    triangle_order = np.concatenate(
+        [np.arange(boundaries[c], boundaries[c] + sizes[c])
+         for c in cluster_order]) if len(boundaries) else np.zeros(0, int)
+    return np.asarray(optimized)[triangle_order]
+
+
+def optimize_vertex_fetch(indices, vertices):
+    """ Renumbers the vertices in the order the triangles first use them.
+
+        The vertex shader then reads the vertex buffer almost sequentially.
+        Vertices no triangle uses are dropped.
+
+    Args:
+        indices (array like): The (n, 3) vertex indices.
+        vertices (array like): The vertex array (positions or interleaved
+            attributes), one row per vertex.
+
+    Returns:
+        Tuple of numpy.ndarray: The reordered vertices and the renumbered
+        indices (with the dtype of the input).
+    """
+    source = np.asarray(indices)
+    flat = _as_indices(indices).ravel()
+    used, first = np.unique(flat, return_index=True)
+    order = used[np.argsort(first, kind="stable")]
+    remap = np.empty(int(flat.max()) + 1 if len(flat) else 0, dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    new_indices = remap[flat].astype(source.dtype).reshape(-1, 3)
+    return np.asarray(vertices)[order], new_indices
+
+
+def compare_orders(indices, vertices, cache_size=32):
+    """ Returns the cache statistics of a mesh before and after the
+        optimization, and of the greedy triangle strip of the mesh.
+
+    Returns:
+        dict: Statistics for 'original', 'optimized' and 'strip'.
+    """
+    optimized = optimize_overdraw(indices, vertices, cache_size)
+    strip = find_strip_greedy(_as_indices(indices))
+    unique = len(np.unique(_as_indices(indices)))
+    strip_misses = cache_misses(strip, cache_size)
+    return {
+        'original': cache_statistics(indices, cache_size),
+        'optimized': cache_statistics(optimized, cache_size),
+        'strip': {
+            'misses': strip_misses,
+            'acmr': strip_misses / len(indices) if len(indices) else 0.0,
+            'atvr': strip_misses / unique if unique else 0.0,
+            'indices': len(strip),
+        },
+    }
+
+
+def example():
+    from geometry import grid_triangles
+
+    rows = columns = 60
+    x, y = np.meshgrid(np.arange(columns + 1), np.arange(rows + 1))
+    vertices = np.stack([x.ravel(), y.ravel()], axis=1).astype(np.float32)
+    # a shuffled triangle order is the worst case for the cache
+    indices = grid_triangles(rows, columns)
+    indices = indices[np.random.default_rng(0).permutation(len(indices))]
+
+    for cache_size in (16, 32):
+        print(f"cache size {cache_size}:")
+        for name, stats in compare_orders(indices, vertices,
+                                          cache_size).items():
+            print(f"  {name}: ACMR {stats['acmr']:.3f}, "
+                  f"ATVR {stats['atvr']:.3f}")
+
+
+if __name__ == "__main__":
+    example()